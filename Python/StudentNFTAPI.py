@@ -1,15 +1,58 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, send_file, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 import requests
 from web3 import Web3
 import json
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
 from requests_toolbelt import MultipartEncoder
-from pathlib import Path
 from collections import OrderedDict
 import pyshorteners
 import random
+import sqlite3
+import threading
+import fcntl
+import time
+import bisect
+import numpy as np
+import hashlib
+import hmac
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import base64
+from certificate_render import render_certificate, CERTIFICATE_FONT, CERTIFICATE_TEXT_BAND, CERTIFICATE_TEXT_LAYOUT
+import csv
+import io
+import math
+import functools
+
+import gzip
+import sys
+import cProfile
+import marshal
+import uuid
+import re
+from collections import deque, defaultdict
+
+# Parquet export is optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Fast JSON encoding and brotli compression are optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from contextlib import contextmanager
+from web3.logs import DISCARD
 
 load_dotenv()
 
@@ -20,17 +63,120 @@ accountAddress = os.getenv("ACCOUNT_ADDRESS")
 localRPC = "http://127.0.0.1:8545"
 
 # Contract and Pinata configuration
-contractJSON = r"/run/media/purva/Personal Files/CIE_Internship2025/DemoV3/summer-2025/SW2/StudentNFT/Solidity/artifacts/contracts/StudentNFT.sol/StudentBadgeNFT.json"
+contractJSON = os.getenv("CONTRACT_JSON", r"/run/media/purva/Personal Files/CIE_Internship2025/DemoV3/summer-2025/SW2/StudentNFT/Solidity/artifacts/contracts/StudentNFT.sol/StudentBadgeNFT.json")
 pinataJWT = os.getenv("PINATA_JWT")
 pinataBaseURL = os.getenv("PINATA_BASE_URL")
 pinataLegacyURL = os.getenv("PINATA_LEGACY_URL")
+pinataUploadURL = os.getenv("PINATA_UPLOAD_URL", "https://uploads.pinata.cloud/v3/files")
+pinataPinFileURL = os.getenv("PINATA_PIN_FILE_URL", "https://api.pinata.cloud/pinning/pinFileToIPFS")
+IPFS_GATEWAY_URL = os.getenv("IPFS_GATEWAY_URL", "https://gateway.pinata.cloud/ipfs")
+PINATA_BATCH_TIMEOUT = 300
+
+# IPFS gateway pool used for metadata reads (the local node is a stand-in for a nearby gateway)
+IPFS_GATEWAYS = [g.strip() for g in os.getenv(
+    "IPFS_GATEWAYS", f"{IPFS_GATEWAY_URL},https://ipfs.io/ipfs,http://127.0.0.1:8080/ipfs").split(",") if g.strip()]
+GATEWAY_TIMEOUT = 10
+GATEWAY_EWMA_ALPHA = 0.2
+GATEWAY_LATENCY_WINDOW = 100
+GATEWAY_HEDGE_PERCENTILE = 90
+GATEWAY_HEDGE_MIN_DELAY = 0.05
+GATEWAY_HEDGE_DEFAULT_DELAY = 0.5
+GATEWAY_FETCH_WORKERS = 32
 STUDENT_BADGE_DATA = "./StudentBadges/StudentBadgeData.json"
+BADGE_LOG_LOCK = STUDENT_BADGE_DATA + ".lock"
+# Append-only copy of every upload record, read incrementally by the reconciliation job
+BADGE_UPLOAD_JOURNAL = "./StudentBadges/StudentBadgeUploads.jsonl"
+BADGE_LOG_READ_SIZE = 64 * 1024
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_COLUMNS = ["student_name", "class_semester", "university", "badge_type", "grant_date", "metadata_uri",
+                  "user_address", "tokens_used", "tx_hash", "mint_status", "token_id"]
 CERTIFICATE_DIR = "certificates"
+RENDERED_CERTIFICATE_DIR = os.path.join(CERTIFICATE_DIR, "rendered")
+CERTIFICATE_RENDER_WORKERS = int(os.getenv("CERTIFICATE_RENDER_WORKERS", str(os.cpu_count() or 2)))
+CERTIFICATE_RENDER_TIMEOUT = 60
 
 # Quiz configuration
 TOKENS_PER_CORRECT_ANSWER = 50
 MINIMUM_TOKENS_FOR_NFT = 300
 QUIZ_QUESTIONS_FILE = "quiz_questions.json"
+WALLET_MAPPING_FILE = os.getenv("WALLET_MAPPING_FILE", "./UI/StudentWalletMapping.json")
+
+# Leaderboard configuration
+LEADERBOARD_PERIODS = ["all", "month", "week"]
+LEADERBOARD_MAX_LIMIT = 100
+
+# Idempotency keys for uploadMetadata and mintBadge (kept in the state backend)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = 10000
+IDEMPOTENCY_WAIT_SECONDS = 120
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+IDEMPOTENCY_PENDING_TIMEOUT = 600
+
+# Admission control configuration (limits apply per worker process)
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0.5"))
+RATE_LIMIT_MAX_TRACKED_USERS = 100000
+DEPENDENCY_CONCURRENCY = {
+    "rpc": int(os.getenv("RPC_CONCURRENCY", "8")),
+    "pinata": int(os.getenv("PINATA_CONCURRENCY", "4")),
+    "gateway": int(os.getenv("GATEWAY_CONCURRENCY", "4"))
+}
+DEPENDENCY_RETRY_AFTER = 1
+
+# Conditional GET configuration
+RESPONSE_CACHE_ENTRIES = 1024
+
+# Response encoding configuration
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson" if orjson is not None else "json")
+if JSON_ENCODER not in ("json", "orjson"):
+    raise ValueError(f"Unknown JSON_ENCODER: {JSON_ENCODER}")
+if JSON_ENCODER == "orjson" and orjson is None:
+    raise RuntimeError("JSON_ENCODER=orjson requires the orjson package to be installed")
+COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+# Request profiling configuration (hooks are only installed when one of these is set)
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILES_KEPT = 50
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+# Quiz push channel (Server-Sent Events) configuration
+QUIZ_CHANNEL_POLL_INTERVAL = float(os.getenv("QUIZ_CHANNEL_POLL_INTERVAL", "0.2"))
+QUIZ_CHANNEL_KEEPALIVE_SECONDS = 15
+QUIZ_CHANNEL_MAX_SECONDS = 1800
+QUIZ_CHANNEL_CREDIT_WAIT = 2.0
+
+# Roster configuration
+ROSTER_MAX_PAGE_SIZE = 500
+INITIAL_USER_TOKENS = 10000
+
+# Question analytics configuration
+ANSWER_BUFFER_INITIAL_CAPACITY = 4096
+DISCRIMINATION_GROUP_FRACTION = 0.27
+
+# State backend configuration ("memory" for a single process, "sqlite" to share state across workers)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "./StudentBadges/state.sqlite3")
+
+# Mint receipt watcher configuration
+MINT_WATCH_INTERVAL = float(os.getenv("MINT_WATCH_INTERVAL", "1.0"))
+MINT_STALE_BLOCKS = 20
+MINT_RESULTS_KEPT = 10000
+
+# Chain-vs-local reconciliation configuration
+RECONCILE_DB_PATH = os.getenv("RECONCILE_DB_PATH", "./StudentBadges/reconcile.sqlite3")
+RECONCILE_START_BLOCK = int(os.getenv("RECONCILE_START_BLOCK", "0"))
+RECONCILE_LOG_CHUNK_BLOCKS = 2000
+RECONCILE_GRACE_SECONDS = float(os.getenv("RECONCILE_GRACE_SECONDS", "600"))
+
+# Gas and fee configuration for mint transactions
+GAS_SAFETY_MARGIN = float(os.getenv("GAS_SAFETY_MARGIN", "1.25"))
+GAS_URI_BUCKET_SIZE = 64
+FEE_CACHE_SECONDS = float(os.getenv("FEE_CACHE_SECONDS", "2.0"))
 
 # Pinata Headers
 PINATA_JWT = os.getenv("PINATA_JWT")
@@ -38,8 +184,77 @@ HEADERS = {
     "Authorization": f"Bearer {PINATA_JWT}"
 }
 
+# Response encoding
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that uses orjson when configured, keeping key insertion order"""
+
+    sort_keys = False
+
+    def _orjson_option(self, indent):
+        return orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+
+    def dumps(self, obj, **kwargs):
+        # Layout arguments are honoured by orjson; anything else needs the stdlib encoder
+        if JSON_ENCODER == "orjson" and set(kwargs) <= {"separators", "indent"}:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_option(kwargs.get("indent"))).decode()
+            except TypeError:
+                # orjson only encodes 64-bit integers; uint256 token ids take the stdlib path
+                pass
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """jsonify() body encoded straight to bytes by orjson, pretty-printed in debug like Flask's"""
+        if JSON_ENCODER != "orjson":
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._orjson_option(indent) | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def encode_json(obj):
+    """JSON bytes for a response body, skipping the str round trip when orjson is in use"""
+    if JSON_ENCODER == "orjson":
+        try:
+            return orjson.dumps(obj, default=FastJSONProvider.default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return app.json.dumps(obj).encode()
+
+def negotiate_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header (quality values of 0 excluded)"""
+    offered = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Connect to blockchain
 web3 = Web3(Web3.HTTPProvider(localRPC))
@@ -111,39 +326,631 @@ QUIZ_QUESTIONS = [
     }
 ]
 
-# In-memory storage for user sessions and tokens
-user_sessions = {}
-user_tokens = {}
+# Question texts never change, so their JSON is encoded once at startup
+def pre_encode_question(question):
+    fragment = json.dumps({"question": question["question"], "options": question["options"]}, separators=(",", ":"))
+    return fragment[1:-1].encode()
+
+PRE_ENCODED_QUESTIONS = {q["id"]: pre_encode_question(q) for q in QUIZ_QUESTIONS}
+
+# State backends for quiz sessions, token balances and leaderboards
+def leaderboard_period_keys(when):
+    """Period keys a quiz result counts towards, e.g. week:2026-W42"""
+    iso_year, iso_week, _ = when.isocalendar()
+    return {
+        "all": "all",
+        "month": f"month:{when.strftime('%Y-%m')}",
+        "week": f"week:{iso_year}-W{iso_week:02d}"
+    }
+
+
+class RankedBoard:
+    """Top-K structure: scores kept in a sorted list so updates are a bisect and reads a slice"""
+
+    def __init__(self):
+        self.scores = {}
+        self.ranking = []
+
+    def set_score(self, user_address, score):
+        old_score = self.scores.get(user_address)
+        if old_score is not None:
+            del self.ranking[bisect.bisect_left(self.ranking, (-old_score, user_address))]
+        self.scores[user_address] = score
+        bisect.insort(self.ranking, (-score, user_address))
+
+    def add_score(self, user_address, delta):
+        self.set_score(user_address, self.scores.get(user_address, 0) + delta)
+
+    def top(self, limit):
+        return [(user_address, -neg_score) for neg_score, user_address in self.ranking[:limit]]
+
+
+# Answer events for per-question analytics
+def answer_option_code(chosen_option):
+    # Out-of-range answers are kept for accuracy but excluded from the option distribution
+    return chosen_option if isinstance(chosen_option, int) and 0 <= chosen_option < 128 else -1
+
+class AnswerEventBuffer:
+    """Columnar, append-only record of every graded answer, held in process memory"""
+
+    def __init__(self, capacity):
+        self.size = 0
+        self.question_ids = np.empty(capacity, dtype=np.int32)
+        self.chosen_options = np.empty(capacity, dtype=np.int8)
+        self.correct = np.empty(capacity, dtype=np.bool_)
+        self.latencies = np.empty(capacity, dtype=np.float32)
+        self.respondents = np.empty(capacity, dtype=np.int32)
+        self.respondent_index = {}
+        self.lock = threading.Lock()
+
+    def _grow(self):
+        capacity = len(self.question_ids) * 2
+        for column in ("question_ids", "chosen_options", "correct", "latencies", "respondents"):
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def append(self, session_id, question_id, chosen_option, is_correct, latency):
+        with self.lock:
+            if self.size == len(self.question_ids):
+                self._grow()
+            i = self.size
+            self.question_ids[i] = question_id
+            self.chosen_options[i] = answer_option_code(chosen_option)
+            self.correct[i] = is_correct
+            self.latencies[i] = latency if latency is not None else np.nan
+            self.respondents[i] = self.respondent_index.setdefault(session_id, len(self.respondent_index))
+            self.size += 1
+
+    def extend(self, question_ids, chosen_options, correct, latencies, respondents):
+        """Append columns of already coded events (respondents as dense integer ids)"""
+        with self.lock:
+            n = len(question_ids)
+            while self.size + n > len(self.question_ids):
+                self._grow()
+            end = self.size + n
+            self.question_ids[self.size:end] = question_ids
+            self.chosen_options[self.size:end] = chosen_options
+            self.correct[self.size:end] = correct
+            self.latencies[self.size:end] = latencies
+            self.respondents[self.size:end] = respondents
+            self.size = end
+
+    def snapshot(self):
+        with self.lock:
+            n = self.size
+            return (self.question_ids[:n].copy(), self.chosen_options[:n].copy(), self.correct[:n].copy(),
+                    self.latencies[:n].copy(), self.respondents[:n].copy())
+
+class InMemoryStateBackend:
+    """Keeps sessions and balances in process memory. Only valid for a single worker."""
+
+    def __init__(self):
+        self.user_sessions = {}
+        self.user_tokens = {}
+        self.token_versions = {}
+        self.token_board = RankedBoard()
+        self.quiz_boards = {}
+        self.roster_addresses = {}
+        self.roster_names = {}
+        self.roster_keys = []
+        self.mint_charges = {}
+        self.idempotency_keys = OrderedDict()
+        self.answer_events = AnswerEventBuffer(ANSWER_BUFFER_INITIAL_CAPACITY)
+        # Version counters restart with the process, so validators must not outlive it
+        self.epoch = uuid.uuid4().hex
+        self.lock = threading.RLock()
+        self.idempotency_changed = threading.Condition(self.lock)
+
+    def get_session(self, session_id):
+        with self.lock:
+            session = self.user_sessions.get(session_id)
+            return dict(session) if session is not None else None
+
+    def save_session(self, session_id, session):
+        """Store the session if nobody saved it since it was read; returns False on a conflict"""
+        with self.lock:
+            current = self.user_sessions.get(session_id)
+            if current is not None and current["version"] != session.get("version"):
+                return False
+            session["version"] = session.get("version", 0) + 1
+            session["updated_at"] = time.time()
+            self.user_sessions[session_id] = dict(session)
+            return True
+
+    def initialize_tokens(self, user_address, initial_tokens):
+        with self.lock:
+            if user_address not in self.user_tokens:
+                self._set_tokens(user_address, initial_tokens)
+            return self.user_tokens[user_address]
+
+    def _set_tokens(self, user_address, tokens):
+        version, _ = self.token_versions.get(user_address, (0, None))
+        self.user_tokens[user_address] = tokens
+        self.token_versions[user_address] = (version + 1, time.time())
+        self.token_board.set_score(user_address, tokens)
+
+    def get_tokens(self, user_address):
+        with self.lock:
+            return self.user_tokens.get(user_address, 0)
+
+    def get_balance_state(self, user_address):
+        """(tokens, version, updated_at) for conditional reads"""
+        with self.lock:
+            version, updated_at = self.token_versions.get(user_address, (0, None))
+            return self.user_tokens.get(user_address, 0), version, updated_at
+
+    def add_tokens(self, user_address, amount):
+        with self.lock:
+            self._set_tokens(user_address, self.user_tokens.get(user_address, 0) + amount)
+            return self.user_tokens[user_address]
+
+    def deduct_tokens(self, user_address, amount):
+        with self.lock:
+            if self.user_tokens.get(user_address, 0) < amount:
+                return False
+            self._set_tokens(user_address, self.user_tokens[user_address] - amount)
+            return True
+
+    def record_mint_charge(self, tx_hash, user_address, token_uri, amount):
+        with self.lock:
+            self.mint_charges[tx_hash] = {"tx_hash": tx_hash, "user_address": user_address, "token_uri": token_uri,
+                                          "amount": amount, "status": "pending", "charged_at": time.time()}
+
+    def settle_mint_charge(self, tx_hash, status):
+        with self.lock:
+            if tx_hash in self.mint_charges:
+                self.mint_charges[tx_hash]["status"] = status
+
+    def refund_mint_charge(self, tx_hash):
+        """Move a pending charge to reverted and credit it back; returns the amount refunded (0 if not pending)"""
+        with self.lock:
+            charge = self.mint_charges.get(tx_hash)
+            if charge is None or charge["status"] != "pending":
+                return 0
+            charge["status"] = "reverted"
+            self._set_tokens(charge["user_address"], self.user_tokens.get(charge["user_address"], 0) + charge["amount"])
+            return charge["amount"]
+
+    def open_mint_charges(self):
+        with self.lock:
+            return [dict(charge) for charge in self.mint_charges.values() if charge["status"] == "pending"]
+
+    def record_answer_event(self, session_id, question_id, chosen_option, is_correct, latency):
+        self.answer_events.append(session_id, question_id, chosen_option, is_correct, latency)
+
+    def answer_event_columns(self):
+        """(question_ids, chosen_options, correct, latencies, respondents) as NumPy arrays"""
+        return self.answer_events.snapshot()
+
+    def claim_idempotency_key(self, key, fingerprint, now):
+        """("claimed", None), ("pending", None), ("done", (status, body)) or ("mismatch", None)"""
+        with self.lock:
+            while self.idempotency_keys:
+                oldest = next(iter(self.idempotency_keys.values()))
+                if now - oldest["created_at"] < IDEMPOTENCY_TTL_SECONDS:
+                    break
+                self.idempotency_keys.popitem(last=False)
+            entry = self.idempotency_keys.get(key)
+            if entry is None or (entry["status"] == "pending" and now - entry["created_at"] >= IDEMPOTENCY_PENDING_TIMEOUT):
+                self.idempotency_keys.pop(key, None)
+                self.idempotency_keys[key] = {"fingerprint": fingerprint, "status": "pending", "created_at": now}
+                while len(self.idempotency_keys) > IDEMPOTENCY_MAX_KEYS:
+                    self.idempotency_keys.popitem(last=False)
+                return "claimed", None
+            if entry["fingerprint"] != fingerprint:
+                return "mismatch", None
+            if entry["status"] == "done":
+                return "done", (entry["response_status"], entry["response_body"])
+            return "pending", None
+
+    def complete_idempotency_key(self, key, response_status, response_body):
+        with self.lock:
+            entry = self.idempotency_keys.get(key)
+            if entry is not None:
+                entry.update(status="done", response_status=response_status, response_body=response_body)
+            self.idempotency_changed.notify_all()
+
+    def release_idempotency_key(self, key):
+        with self.lock:
+            self.idempotency_keys.pop(key, None)
+            self.idempotency_changed.notify_all()
+
+    def wait_idempotency_key(self, key, timeout):
+        with self.lock:
+            self.idempotency_changed.wait(timeout)
+
+    def record_quiz_score(self, user_address, points, when):
+        with self.lock:
+            for period_key in leaderboard_period_keys(when).values():
+                self.quiz_boards.setdefault(period_key, RankedBoard()).add_score(user_address, points)
+
+    def top_tokens(self, limit):
+        with self.lock:
+            return self.token_board.top(limit)
+
+    def top_quiz_scores(self, period_key, limit):
+        with self.lock:
+            board = self.quiz_boards.get(period_key)
+            return board.top(limit) if board else []
+
+    def import_roster(self, students, initial_tokens=None):
+        """Add or update (name, address) pairs, optionally initializing their balances"""
+        with self.lock:
+            for student_name, user_address in students:
+                old_address = self.roster_addresses.get(student_name)
+                if old_address is not None:
+                    self.roster_names.pop(old_address, None)
+                old_name = self.roster_names.get(user_address)
+                if old_name is not None and old_name != student_name:
+                    self.roster_addresses.pop(old_name, None)
+                self.roster_addresses[student_name] = user_address
+                self.roster_names[user_address] = student_name
+                if initial_tokens is not None:
+                    self.initialize_tokens(user_address, initial_tokens)
+            # One sort per import keeps prefix search a bisect
+            self.roster_keys = sorted((name.casefold(), name) for name in self.roster_addresses)
+
+    def roster_count(self):
+        with self.lock:
+            return len(self.roster_keys)
+
+    def roster_page(self, offset, limit):
+        with self.lock:
+            return [(name, self.roster_addresses[name]) for _, name in self.roster_keys[offset:offset + limit]]
+
+    def roster_search(self, prefix, limit):
+        prefix = prefix.casefold()
+        with self.lock:
+            start = bisect.bisect_left(self.roster_keys, (prefix, ""))
+            matches = []
+            for key, name in self.roster_keys[start:start + limit]:
+                if not key.startswith(prefix):
+                    break
+                matches.append((name, self.roster_addresses[name]))
+            return matches
+
+    def roster_address(self, student_name):
+        with self.lock:
+            return self.roster_addresses.get(student_name)
+
+    def roster_name(self, user_address):
+        with self.lock:
+            return self.roster_names.get(user_address)
+
+
+class SQLiteStateBackend:
+    """Keeps sessions and balances in a local SQLite file shared by every worker on the host."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS user_sessions (session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS user_tokens (user_address TEXT PRIMARY KEY, tokens INTEGER NOT NULL, "
+                     "version INTEGER NOT NULL DEFAULT 1, updated_at REAL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS user_tokens_rank ON user_tokens (tokens DESC, user_address)")
+        conn.execute("CREATE TABLE IF NOT EXISTS quiz_scores (period_key TEXT NOT NULL, user_address TEXT NOT NULL, "
+                     "score INTEGER NOT NULL, PRIMARY KEY (period_key, user_address))")
+        conn.execute("CREATE INDEX IF NOT EXISTS quiz_scores_rank ON quiz_scores (period_key, score DESC, user_address)")
+        conn.execute("CREATE TABLE IF NOT EXISTS roster (student_name TEXT PRIMARY KEY, user_address TEXT NOT NULL UNIQUE, "
+                     "name_key TEXT NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS roster_name_key ON roster (name_key, student_name)")
+        conn.execute("CREATE TABLE IF NOT EXISTS mint_charges (tx_hash TEXT PRIMARY KEY, user_address TEXT NOT NULL, "
+                     "token_uri TEXT NOT NULL, amount INTEGER NOT NULL, status TEXT NOT NULL, charged_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS mint_charges_status ON mint_charges (status)")
+        conn.execute("CREATE TABLE IF NOT EXISTS idempotency_keys (idempotency_key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                     "status TEXT NOT NULL, response_status INTEGER, response_body BLOB, created_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idempotency_keys_created ON idempotency_keys (created_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS state_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO state_meta (name, value) VALUES ('epoch', ?)", (uuid.uuid4().hex,))
+        # Counters live as long as the database file, and so does its epoch
+        self.epoch = conn.execute("SELECT value FROM state_meta WHERE name = 'epoch'").fetchone()[0]
+        # Respondents are numbered densely in order of their first answer
+        conn.execute("CREATE TABLE IF NOT EXISTS answer_respondents (respondent_id INTEGER PRIMARY KEY, "
+                     "session_id TEXT NOT NULL UNIQUE)")
+        conn.execute("CREATE TABLE IF NOT EXISTS answer_events (event_id INTEGER PRIMARY KEY, respondent_id INTEGER NOT NULL, "
+                     "question_id INTEGER NOT NULL, chosen_option INTEGER NOT NULL, correct INTEGER NOT NULL, latency REAL)")
+        # Columns already read back by this process; later calls only fetch newer events
+        self.answer_events = AnswerEventBuffer(ANSWER_BUFFER_INITIAL_CAPACITY)
+        self.answer_events_read_through = 0
+        self.answer_events_lock = threading.Lock()
+
+    def _conn(self):
+        # One connection per thread; WAL lets readers run alongside the single writer
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get_session(self, session_id):
+        row = self._conn().execute(
+            "SELECT data FROM user_sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_session(self, session_id, session):
+        """Store the session if nobody saved it since it was read; returns False on a conflict"""
+        expected = session.get("version", 0)
+        session["version"] = expected + 1
+        session["updated_at"] = time.time()
+        conn = self._conn()
+        if expected == 0:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO user_sessions (session_id, version, data) VALUES (?, ?, ?)",
+                (session_id, session["version"], json.dumps(session)))
+        else:
+            cursor = conn.execute(
+                "UPDATE user_sessions SET version = ?, data = ? WHERE session_id = ? AND version = ?",
+                (session["version"], json.dumps(session), session_id, expected))
+        if cursor.rowcount != 1:
+            session["version"] = expected
+            return False
+        return True
+
+    def initialize_tokens(self, user_address, initial_tokens):
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO user_tokens (user_address, tokens, updated_at) VALUES (?, ?, ?)",
+                     (user_address, initial_tokens, time.time()))
+        return self.get_tokens(user_address)
+
+    def get_tokens(self, user_address):
+        row = self._conn().execute(
+            "SELECT tokens FROM user_tokens WHERE user_address = ?", (user_address,)).fetchone()
+        return row[0] if row else 0
+
+    def get_balance_state(self, user_address):
+        """(tokens, version, updated_at) for conditional reads"""
+        row = self._conn().execute(
+            "SELECT tokens, version, updated_at FROM user_tokens WHERE user_address = ?", (user_address,)).fetchone()
+        return tuple(row) if row else (0, 0, None)
+
+    def add_tokens(self, user_address, amount):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO user_tokens (user_address, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_address) DO UPDATE SET tokens = tokens + excluded.tokens, "
+                "version = version + 1, updated_at = excluded.updated_at",
+                (user_address, amount, time.time()))
+            tokens = self.get_tokens(user_address)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return tokens
+
+    def deduct_tokens(self, user_address, amount):
+        # Single conditional UPDATE so concurrent workers can never overdraw a balance
+        cursor = self._conn().execute(
+            "UPDATE user_tokens SET tokens = tokens - ?, version = version + 1, updated_at = ? "
+            "WHERE user_address = ? AND tokens >= ?",
+            (amount, time.time(), user_address, amount))
+        return cursor.rowcount == 1
+
+    def record_mint_charge(self, tx_hash, user_address, token_uri, amount):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO mint_charges (tx_hash, user_address, token_uri, amount, status, charged_at) "
+            "VALUES (?, ?, ?, ?, 'pending', ?)", (tx_hash, user_address, token_uri, amount, time.time()))
+
+    def settle_mint_charge(self, tx_hash, status):
+        self._conn().execute("UPDATE mint_charges SET status = ? WHERE tx_hash = ?", (status, tx_hash))
+
+    def refund_mint_charge(self, tx_hash):
+        """Move a pending charge to reverted and credit it back; returns the amount refunded (0 if not pending)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Conditional on the status, so a charge is refunded at most once whichever worker gets here
+            cursor = conn.execute("UPDATE mint_charges SET status = 'reverted' WHERE tx_hash = ? AND status = 'pending'",
+                                  (tx_hash,))
+            amount = 0
+            if cursor.rowcount == 1:
+                user_address, amount = conn.execute(
+                    "SELECT user_address, amount FROM mint_charges WHERE tx_hash = ?", (tx_hash,)).fetchone()
+                conn.execute(
+                    "INSERT INTO user_tokens (user_address, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_address) DO UPDATE SET tokens = tokens + excluded.tokens, "
+                    "version = version + 1, updated_at = excluded.updated_at",
+                    (user_address, amount, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return amount
+
+    def open_mint_charges(self):
+        # The status index keeps this proportional to unresolved charges, not the whole history
+        rows = self._conn().execute(
+            "SELECT tx_hash, user_address, token_uri, amount, status, charged_at FROM mint_charges "
+            "WHERE status = 'pending'").fetchall()
+        return [dict(zip(("tx_hash", "user_address", "token_uri", "amount", "status", "charged_at"), row))
+                for row in rows]
+
+    def record_answer_event(self, session_id, question_id, chosen_option, is_correct, latency):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO answer_respondents (session_id) VALUES (?)", (session_id,))
+            conn.execute(
+                "INSERT INTO answer_events (respondent_id, question_id, chosen_option, correct, latency) "
+                "SELECT respondent_id, ?, ?, ?, ? FROM answer_respondents WHERE session_id = ?",
+                (question_id, answer_option_code(chosen_option), int(is_correct), latency, session_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def answer_event_columns(self):
+        """(question_ids, chosen_options, correct, latencies, respondents) as NumPy arrays, across all workers"""
+        with self.answer_events_lock:
+            # Event ids grow in commit order (there is a single writer at a time), so nothing is skipped
+            rows = self._conn().execute(
+                "SELECT event_id, question_id, chosen_option, correct, latency, respondent_id - 1 FROM answer_events "
+                "WHERE event_id > ? ORDER BY event_id", (self.answer_events_read_through,)).fetchall()
+            if rows:
+                # All numeric, so one conversion; a NULL latency becomes NaN
+                columns = np.array(rows, dtype=np.float64)
+                self.answer_events.extend(*columns[:, 1:].T)
+                self.answer_events_read_through = int(columns[-1, 0])
+        return self.answer_events.snapshot()
+
+    def claim_idempotency_key(self, key, fingerprint, now):
+        """("claimed", None), ("pending", None), ("done", (status, body)) or ("mismatch", None)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM idempotency_keys WHERE created_at <= ?", (now - IDEMPOTENCY_TTL_SECONDS,))
+            row = conn.execute(
+                "SELECT fingerprint, status, response_status, response_body, created_at FROM idempotency_keys "
+                "WHERE idempotency_key = ?", (key,)).fetchone()
+            if row is None or (row[1] == "pending" and now - row[4] >= IDEMPOTENCY_PENDING_TIMEOUT):
+                conn.execute("INSERT OR REPLACE INTO idempotency_keys (idempotency_key, fingerprint, status, created_at) "
+                             "VALUES (?, ?, 'pending', ?)", (key, fingerprint, now))
+                conn.execute("DELETE FROM idempotency_keys WHERE idempotency_key IN (SELECT idempotency_key FROM "
+                             "idempotency_keys ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (IDEMPOTENCY_MAX_KEYS,))
+                outcome = "claimed", None
+            elif row[0] != fingerprint:
+                outcome = "mismatch", None
+            elif row[1] == "done":
+                outcome = "done", (row[2], bytes(row[3]))
+            else:
+                outcome = "pending", None
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return outcome
+
+    def complete_idempotency_key(self, key, response_status, response_body):
+        self._conn().execute(
+            "UPDATE idempotency_keys SET status = 'done', response_status = ?, response_body = ? WHERE idempotency_key = ?",
+            (response_status, response_body, key))
+
+    def release_idempotency_key(self, key):
+        self._conn().execute("DELETE FROM idempotency_keys WHERE idempotency_key = ?", (key,))
+
+    def wait_idempotency_key(self, key, timeout):
+        # The in-flight request may be on another worker, so poll
+        time.sleep(timeout)
+
+    def record_quiz_score(self, user_address, points, when):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for period_key in leaderboard_period_keys(when).values():
+                conn.execute(
+                    "INSERT INTO quiz_scores (period_key, user_address, score) VALUES (?, ?, ?) "
+                    "ON CONFLICT(period_key, user_address) DO UPDATE SET score = score + excluded.score",
+                    (period_key, user_address, points))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def top_tokens(self, limit):
+        # Walks the rank index, so only `limit` rows are read
+        return self._conn().execute(
+            "SELECT user_address, tokens FROM user_tokens ORDER BY tokens DESC, user_address LIMIT ?",
+            (limit,)).fetchall()
+
+    def top_quiz_scores(self, period_key, limit):
+        return self._conn().execute(
+            "SELECT user_address, score FROM quiz_scores WHERE period_key = ? "
+            "ORDER BY score DESC, user_address LIMIT ?", (period_key, limit)).fetchall()
+
+    def import_roster(self, students, initial_tokens=None):
+        """Add or update (name, address) pairs, optionally initializing their balances"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM roster WHERE user_address = ? AND student_name != ?",
+                             [(user_address, student_name) for student_name, user_address in students])
+            conn.executemany("INSERT OR REPLACE INTO roster (student_name, user_address, name_key) VALUES (?, ?, ?)",
+                             [(student_name, user_address, student_name.casefold())
+                              for student_name, user_address in students])
+            if initial_tokens is not None:
+                now = time.time()
+                conn.executemany("INSERT OR IGNORE INTO user_tokens (user_address, tokens, updated_at) VALUES (?, ?, ?)",
+                                 [(user_address, initial_tokens, now) for _, user_address in students])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def roster_count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM roster").fetchone()[0]
+
+    def roster_page(self, offset, limit):
+        return self._conn().execute(
+            "SELECT student_name, user_address FROM roster ORDER BY name_key, student_name LIMIT ? OFFSET ?",
+            (limit, offset)).fetchall()
+
+    def roster_search(self, prefix, limit):
+        # Range scan on the name_key index instead of LIKE, which cannot use it
+        prefix = prefix.casefold()
+        return self._conn().execute(
+            "SELECT student_name, user_address FROM roster WHERE name_key >= ? AND name_key < ? "
+            "ORDER BY name_key, student_name LIMIT ?", (prefix, prefix + "\U0010ffff", limit)).fetchall()
+
+    def roster_address(self, student_name):
+        row = self._conn().execute(
+            "SELECT user_address FROM roster WHERE student_name = ?", (student_name,)).fetchone()
+        return row[0] if row else None
+
+    def roster_name(self, user_address):
+        row = self._conn().execute(
+            "SELECT student_name FROM roster WHERE user_address = ?", (user_address,)).fetchone()
+        return row[0] if row else None
+
+
+def create_state_backend(kind):
+    if kind == "memory":
+        return InMemoryStateBackend()
+    if kind == "sqlite":
+        return SQLiteStateBackend(STATE_DB_PATH)
+    raise ValueError(f"Unknown STATE_BACKEND: {kind}")
+
+state = create_state_backend(STATE_BACKEND)
+
+def seed_roster_from_wallet_mapping():
+    """Load StudentWalletMapping.json into an empty roster"""
+    if state.roster_count() > 0:
+        return
+    try:
+        with open(WALLET_MAPPING_FILE) as f:
+            state.import_roster(list(json.load(f).items()))
+    except FileNotFoundError:
+        pass
+
+seed_roster_from_wallet_mapping()
 
 # Utility functions
 def get_nonce(address):
     return web3.eth.get_transaction_count(address)
 
-def initialize_user_tokens(user_address, initial_tokens=10000):
+def initialize_user_tokens(user_address, initial_tokens=INITIAL_USER_TOKENS):
     """Initialize user with tokens if not already present"""
-    if user_address not in user_tokens:
-        user_tokens[user_address] = initial_tokens
-    return user_tokens[user_address]
+    return state.initialize_tokens(user_address, initial_tokens)
 
 def get_user_tokens(user_address):
     """Get current token balance for user"""
-    return user_tokens.get(user_address, 0)
+    return state.get_tokens(user_address)
 
 def add_tokens(user_address, amount):
     """Add tokens to user balance"""
-    if user_address not in user_tokens:
-        user_tokens[user_address] = 0
-    user_tokens[user_address] += amount
-    return user_tokens[user_address]
+    return state.add_tokens(user_address, amount)
 
 def deduct_tokens(user_address, amount):
     """Deduct tokens from user balance"""
-    if user_address not in user_tokens:
-        return False
-    if user_tokens[user_address] < amount:
-        return False
-    user_tokens[user_address] -= amount
-    return True
+    return state.deduct_tokens(user_address, amount)
 
 # Existing Pinata functions (unchanged)
 def uploadFileToPinata(filePath, name=None, keyValues=None, groupID=None, network="public"):
@@ -171,7 +978,7 @@ def uploadFileToPinata(filePath, name=None, keyValues=None, groupID=None, networ
         "Content-Type": m.content_type
     }
 
-    response = requests.post("https://uploads.pinata.cloud/v3/files",
+    response = requests.post(pinataUploadURL,
                              headers=headers,
                              data=m,
                              timeout=30)
@@ -200,6 +1007,1307 @@ def uploadMetadataToPinata(metadata):
         raise ValueError("IPFSHash is not found in the Response")
     return responseJSON["IpfsHash"]
 
+def pinDirectoryToPinata(dirName, files, contentType="application/json", keyValues=None):
+    """Pin {fileName: bytes} as a single IPFS directory; files are then addressed as <dir_cid>/<fileName>"""
+    fields = [("file", (f"{dirName}/{fileName}", content, contentType)) for fileName, content in files.items()]
+    fields.append(("pinataMetadata", json.dumps({"name": dirName, "keyvalues": keyValues or {}})))
+    fields.append(("pinataOptions", json.dumps({"cidVersion": 1})))
+
+    m = MultipartEncoder(fields=fields)
+    headers = {
+        "Authorization": f"Bearer {pinataJWT}",
+        "Content-Type": m.content_type
+    }
+    response = requests.post(pinataPinFileURL, headers=headers, data=m, timeout=PINATA_BATCH_TIMEOUT)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Pinning Directory to Pinata Failed: {response.status_code} - {response.text}")
+
+    responseJSON = response.json()
+    if "IpfsHash" not in responseJSON:
+        raise ValueError("IPFSHash is not found in the Response")
+    return responseJSON["IpfsHash"]
+
+def safe_file_name(text):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", text).strip("_") or "file"
+
+def badge_pin_content(image, certificate_url, student_name, class_semester, university, grant_date, badge_type):
+    """Token metadata document pinned for every badge; image is {"image_cid": ...} or {"image_path": ...}"""
+    return {
+        **image,
+        "certificate_url": certificate_url,
+        "attributes": [
+            {"Student": student_name},
+            {"Class": class_semester},
+            {"University": university},
+            {"Date": grant_date},
+            {"Badge Type": badge_type},
+            {"Tokens Used": MINIMUM_TOKENS_FOR_NFT}
+        ]
+    }
+
+# Local badge log helpers
+@contextmanager
+def file_lock(lock_path):
+    """Exclusive lock shared by threads and worker processes"""
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def badge_log_lock():
+    """Serialize badge log rewrites across threads and worker processes"""
+    return file_lock(BADGE_LOG_LOCK)
+
+def read_badge_log():
+    if os.path.exists(STUDENT_BADGE_DATA):
+        with open(STUDENT_BADGE_DATA, "r") as f:
+            return json.load(f)
+    return []
+
+def iter_badge_log():
+    """Yield badge log records one at a time, reading the file in fixed-size chunks"""
+    if not os.path.exists(STUDENT_BADGE_DATA):
+        return
+    decoder = json.JSONDecoder()
+    with open(STUDENT_BADGE_DATA, "r") as f:
+        buffer = ""
+        while True:
+            chunk = f.read(BADGE_LOG_READ_SIZE)
+            buffer += chunk
+            pos = 0
+            while True:
+                # Skip the array punctuation between records
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,[":
+                    pos += 1
+                if pos >= len(buffer) or buffer[pos] == "]":
+                    break
+                try:
+                    record, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break  # record continues in the next chunk
+                yield record
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            buffer = buffer[pos:]
+            if not chunk:
+                return
+
+def update_badge_log(mutate):
+    """Apply mutate(badge_data) to the badge log and write it back atomically"""
+    with badge_log_lock():
+        badge_data = read_badge_log()
+        mutate(badge_data)
+        tmp_path = STUDENT_BADGE_DATA + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(badge_data, f, indent=2)
+        os.replace(tmp_path, STUDENT_BADGE_DATA)
+
+def ensure_upload_journal(badge_data):
+    """Start the upload journal from the existing badge log (call with the badge log lock held)"""
+    if os.path.exists(BADGE_UPLOAD_JOURNAL):
+        return
+    existing = badge_data if badge_data is not None else read_badge_log()
+    tmp_path = BADGE_UPLOAD_JOURNAL + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in existing)
+    os.replace(tmp_path, BADGE_UPLOAD_JOURNAL)
+
+def append_badge_log(records):
+    """Add new upload records to the badge log and to the append-only upload journal"""
+    def append(badge_data):
+        ensure_upload_journal(badge_data)
+        with open(BADGE_UPLOAD_JOURNAL, "a") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        badge_data.extend(records)
+    update_badge_log(append)
+
+# Mint receipt watcher
+class MintReceiptWatcher:
+    """Tracks submitted mint transactions and resolves all of them once per new block"""
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_block = None
+
+    def track(self, tx_hash, details):
+        with self.lock:
+            if self.last_block is None or not self.pending:
+                # Scan from the block our first transaction could have landed in; blocks mined
+                # while nothing was pending never need scanning
+                self.last_block = web3.eth.block_number - 1
+            self.pending[tx_hash] = dict(details, tx_hash=tx_hash, submitted_block=self.last_block + 1)
+            # Started lazily so each forked worker gets its own thread
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="mint-receipt-watcher", daemon=True)
+                self.thread.start()
+
+    def status(self, tx_hash):
+        with self.lock:
+            if tx_hash in self.pending:
+                return {"tx_hash": tx_hash, "status": "pending"}
+            return self.results.get(tx_hash)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.lock:
+                if not self.pending:
+                    continue
+            try:
+                self._poll()
+            except Exception as e:
+                print(f"Mint receipt watcher error: {e}")
+
+    def _poll(self):
+        scanned_through = self.last_block
+        with self.lock:
+            waiting = dict(self.pending)
+        latest = web3.eth.block_number
+
+        # One block header per new block tells us which pending hashes got mined
+        included = []
+        for block_number in range(scanned_through + 1, latest + 1):
+            block = web3.eth.get_block(block_number)
+            included.extend(web3.to_hex(h) for h in block["transactions"] if web3.to_hex(h) in waiting)
+
+        # Direct lookups only for hashes tracked after their block was scanned, or missing for too long
+        lookups = []
+        for tx_hash, mint in waiting.items():
+            if tx_hash in included:
+                continue
+            if "looked_up_block" not in mint and mint["submitted_block"] <= scanned_through:
+                lookups.append(tx_hash)
+            elif latest - mint.get("looked_up_block", mint["submitted_block"]) >= MINT_STALE_BLOCKS:
+                lookups.append(tx_hash)
+            mint.setdefault("looked_up_block", latest)
+
+        receipts = self._fetch_receipts(included)
+        for tx_hash in lookups:
+            waiting[tx_hash]["looked_up_block"] = latest
+            try:
+                receipts[tx_hash] = web3.eth.get_transaction_receipt(tx_hash)
+            except Exception:
+                continue
+        for tx_hash, receipt in receipts.items():
+            self._resolve(waiting[tx_hash], receipt)
+        self.last_block = latest
+
+    def _fetch_receipts(self, tx_hashes):
+        if not tx_hashes:
+            return {}
+        if hasattr(web3, "batch_requests"):
+            with web3.batch_requests() as batch:
+                for tx_hash in tx_hashes:
+                    batch.add(web3.eth.get_transaction_receipt(tx_hash))
+                return dict(zip(tx_hashes, batch.execute()))
+        return {tx_hash: web3.eth.get_transaction_receipt(tx_hash) for tx_hash in tx_hashes}
+
+    def _resolve(self, mint, receipt):
+        tx_hash = mint["tx_hash"]
+        outcome = {
+            "tx_hash": tx_hash,
+            "block_number": receipt["blockNumber"],
+            "gas_used": receipt["gasUsed"]
+        }
+        if receipt["status"] == 1:
+            events = contract.events.BadgeMinted().process_receipt(receipt, errors=DISCARD)
+            outcome["status"] = "minted"
+            outcome["token_id"] = events[0]["args"]["tokenId"] if events else None
+        else:
+            outcome["status"] = "reverted"
+            outcome["error"] = self._revert_reason(mint, receipt)
+
+        # Taken off pending before any side effect, so a failure below never resolves it a second time
+        with self.lock:
+            if self.pending.pop(tx_hash, None) is None:
+                return
+            self.results[tx_hash] = outcome
+            while len(self.results) > MINT_RESULTS_KEPT:
+                self.results.popitem(last=False)
+        if outcome["status"] == "reverted":
+            # Only credited if this call moved the charge out of pending
+            outcome["tokens_refunded"] = state.refund_mint_charge(tx_hash)
+        else:
+            state.settle_mint_charge(tx_hash, "minted")
+
+        def publish(badge_data):
+            for record in badge_data:
+                if record.get("metadata_uri") == mint["token_uri"] and record.get("mint_status") != "minted":
+                    record["tx_hash"] = tx_hash
+                    record["mint_status"] = outcome["status"]
+                    if "token_id" in outcome:
+                        record["token_id"] = outcome["token_id"]
+                    break
+        print(f"Mint {tx_hash} resolved: {outcome['status']}")
+        update_badge_log(publish)
+
+    def _revert_reason(self, mint, receipt):
+        # Replay the call against the parent block state to recover the revert message
+        try:
+            contract.functions.mintBadge(mint["recipient"], mint["badge_type"], mint["token_uri"]).call(
+                {"from": accountAddress}, block_identifier=receipt["blockNumber"] - 1)
+        except Exception as e:
+            return str(e)
+        return "Transaction reverted"
+
+mint_watcher = MintReceiptWatcher(MINT_WATCH_INTERVAL)
+
+# Chain-vs-local reconciliation
+class BadgeReconciler:
+    """Diffs BadgeMinted events since the last checkpoint against the upload journal and the mint charges.
+
+    Each run reads only new blocks and newly journaled uploads; every discrepancy is reported once.
+    """
+
+    def __init__(self, db_path, chunk_blocks, grace_seconds):
+        self.db_path = db_path
+        self.chunk_blocks = chunk_blocks
+        self.grace_seconds = grace_seconds
+
+    def _connect(self):
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS reconcile_checkpoint (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS logged_uploads (metadata_uri TEXT PRIMARY KEY, student_name TEXT, "
+                     "user_address TEXT, badge_type TEXT, first_seen_at REAL NOT NULL, token_id TEXT, "
+                     "reported INTEGER NOT NULL DEFAULT 0)")
+        # Only uploads still waiting for their mint are scanned each run
+        conn.execute("CREATE INDEX IF NOT EXISTS logged_uploads_open ON logged_uploads (first_seen_at) "
+                     "WHERE token_id IS NULL AND reported = 0")
+        conn.execute("CREATE TABLE IF NOT EXISTS unlogged_mints (metadata_uri TEXT PRIMARY KEY, token_id TEXT NOT NULL, "
+                     "tx_hash TEXT NOT NULL, block_number INTEGER NOT NULL)")
+        return conn
+
+    def _checkpoint(self, conn, name, default):
+        row = conn.execute("SELECT value FROM reconcile_checkpoint WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _set_checkpoint(self, conn, name, value):
+        conn.execute("INSERT OR REPLACE INTO reconcile_checkpoint (name, value) VALUES (?, ?)", (name, value))
+
+    def _new_uploads(self, offset):
+        """Upload records journaled after byte offset, and the offset to resume from"""
+        with badge_log_lock():
+            ensure_upload_journal(None)
+        records = []
+        with open(BADGE_UPLOAD_JOURNAL, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # still being written; picked up next run
+                offset += len(line)
+                records.append(json.loads(line))
+        return records, offset
+
+    def _events(self, from_block, to_block):
+        # Ranged so providers that cap eth_getLogs spans still answer
+        for start in range(from_block, to_block + 1, self.chunk_blocks):
+            end = min(start + self.chunk_blocks - 1, to_block)
+            yield from contract.events.BadgeMinted.get_logs(from_block=start, to_block=end)
+
+    def run(self):
+        with file_lock(self.db_path + ".lock"):
+            conn = self._connect()
+            try:
+                report = self._run(conn)
+                conn.commit()
+            finally:
+                conn.close()
+        return report
+
+    def _run(self, conn):
+        now = time.time()
+        from_block = self._checkpoint(conn, "block", RECONCILE_START_BLOCK - 1) + 1
+        latest = web3.eth.block_number
+        mints_without_log, duplicate_mints = [], []
+
+        # Uploads journaled since the last run
+        uploads, journal_offset = self._new_uploads(self._checkpoint(conn, "journal_offset", 0))
+        for record in uploads:
+            metadata_uri = record.get("metadata_uri")
+            if metadata_uri is None:
+                continue
+            # Minted before its upload was journaled: no longer a mint without a log entry
+            unlogged = conn.execute("SELECT token_id FROM unlogged_mints WHERE metadata_uri = ?", (metadata_uri,)).fetchone()
+            conn.execute("DELETE FROM unlogged_mints WHERE metadata_uri = ?", (metadata_uri,))
+            conn.execute(
+                "INSERT OR IGNORE INTO logged_uploads (metadata_uri, student_name, user_address, badge_type, "
+                "first_seen_at, token_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (metadata_uri, record.get("student_name"), record.get("user_address"), record.get("badge_type"),
+                 now, unlogged[0] if unlogged else None))
+        self._set_checkpoint(conn, "journal_offset", journal_offset)
+
+        # Mints in the new blocks only
+        events = 0
+        for event in self._events(from_block, latest):
+            events += 1
+            args = event["args"]
+            metadata_uri = args["metadataURI"]
+            mint = {
+                "token_id": args["tokenId"],
+                "recipient": args["recipient"],
+                "badge_type": args["badgeType"],
+                "tx_hash": web3.to_hex(event["transactionHash"]),
+                "block_number": event["blockNumber"],
+                "metadata_uri": metadata_uri
+            }
+            # Also corrects charges that were reported earlier but got mined after all
+            state.settle_mint_charge(mint["tx_hash"], "minted")
+            upload = conn.execute("SELECT token_id FROM logged_uploads WHERE metadata_uri = ?", (metadata_uri,)).fetchone()
+            if upload is not None and upload[0] is None:
+                conn.execute("UPDATE logged_uploads SET token_id = ? WHERE metadata_uri = ?", (str(mint["token_id"]), metadata_uri))
+            elif upload is not None or conn.execute(
+                    "SELECT 1 FROM unlogged_mints WHERE metadata_uri = ?", (metadata_uri,)).fetchone():
+                duplicate_mints.append(mint)
+            else:
+                conn.execute("INSERT INTO unlogged_mints (metadata_uri, token_id, tx_hash, block_number) VALUES (?, ?, ?, ?)",
+                             (metadata_uri, str(mint["token_id"]), mint["tx_hash"], mint["block_number"]))
+                mints_without_log.append(mint)
+        self._set_checkpoint(conn, "block", max(latest, from_block - 1))
+
+        # Uploads that have now waited past the grace period without a mint
+        orphaned_metadata = [
+            dict(zip(("metadata_uri", "student_name", "user_address", "badge_type", "first_seen_at"), row))
+            for row in conn.execute(
+                "SELECT metadata_uri, student_name, user_address, badge_type, first_seen_at FROM logged_uploads "
+                "WHERE token_id IS NULL AND reported = 0 AND first_seen_at <= ?", (now - self.grace_seconds,))
+        ]
+        conn.executemany("UPDATE logged_uploads SET reported = 1 WHERE metadata_uri = ?",
+                         [(entry["metadata_uri"],) for entry in orphaned_metadata])
+
+        # Open charges; receipts are only fetched for the ones that look lost, and each is reported once
+        charges_without_mint = []
+        for charge in state.open_mint_charges():
+            if now - charge["charged_at"] < self.grace_seconds:
+                continue
+            try:
+                receipt = web3.eth.get_transaction_receipt(charge["tx_hash"])
+            except Exception:
+                receipt = None
+            if receipt is not None and receipt["status"] == 1:
+                state.settle_mint_charge(charge["tx_hash"], "minted")
+                continue
+            state.settle_mint_charge(charge["tx_hash"], "unreconciled")
+            charge["receipt_status"] = "reverted" if receipt is not None else "not found"
+            charges_without_mint.append(charge)
+
+        return {
+            "from_block": from_block,
+            "to_block": latest,
+            "events_scanned": events,
+            "log_records_scanned": len(uploads),
+            "orphaned_metadata": orphaned_metadata,
+            "charges_without_mint": charges_without_mint,
+            "mints_without_log": mints_without_log,
+            "duplicate_mints": duplicate_mints
+        }
+
+badge_reconciler = BadgeReconciler(RECONCILE_DB_PATH, RECONCILE_LOG_CHUNK_BLOCKS, RECONCILE_GRACE_SECONDS)
+
+# Gas and fee strategy for mint transactions
+class MintFeeStrategy:
+    """Memoizes gas limits per (badge type, URI length bucket) and fee data per block"""
+
+    def __init__(self, safety_margin, bucket_size, fee_cache_seconds):
+        self.safety_margin = safety_margin
+        self.bucket_size = bucket_size
+        self.fee_cache_seconds = fee_cache_seconds
+        self.gas_limits = {}
+        self.fee_fields = None
+        self.fee_block = None
+        self.fee_fetched_at = 0
+        self.lock = threading.Lock()
+
+    def gas_limit(self, badge_type, token_uri):
+        bucket = len(token_uri) // self.bucket_size + 1
+        key = (badge_type, bucket)
+        limit = self.gas_limits.get(key)
+        if limit is None:
+            # Estimate the worst case for the bucket: longest URI and a recipient with no tokens yet
+            padded_uri = token_uri.ljust(bucket * self.bucket_size - 1, "0")
+            fresh_recipient = Web3.to_checksum_address("0x" + os.urandom(20).hex())
+            estimate = contract.functions.mintBadge(fresh_recipient, badge_type, padded_uri).estimate_gas(
+                {"from": accountAddress})
+            limit = int(estimate * self.safety_margin)
+            self.gas_limits[key] = limit
+        return limit
+
+    def fee_params(self):
+        with self.lock:
+            # A newer block seen by the receipt watcher also invalidates the cached fees
+            stale = (time.monotonic() - self.fee_fetched_at >= self.fee_cache_seconds or
+                     (mint_watcher.last_block or 0) > (self.fee_block or 0))
+            if self.fee_fields is None or stale:
+                self.fee_fields, self.fee_block = self._fetch_fee_fields()
+                self.fee_fetched_at = time.monotonic()
+            return dict(self.fee_fields)
+
+    def _fetch_fee_fields(self):
+        block = web3.eth.get_block("latest")
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is None:
+            return {"gasPrice": web3.eth.gas_price}, block["number"]
+        priority_fee = web3.eth.max_priority_fee
+        # Leaves room for the base fee to double before the transaction stops being includable
+        return {
+            "maxFeePerGas": 2 * base_fee + priority_fee,
+            "maxPriorityFeePerGas": priority_fee
+        }, block["number"]
+
+    def transaction_params(self, badge_type, token_uri):
+        params = {"gas": self.gas_limit(badge_type, token_uri)}
+        params.update(self.fee_params())
+        return params
+
+fee_strategy = MintFeeStrategy(GAS_SAFETY_MARGIN, GAS_URI_BUCKET_SIZE, FEE_CACHE_SECONDS)
+
+# Per-question analytics
+def _grouped_median(values, groups, num_groups):
+    """Median of values per group; NaN values are ignored"""
+    keep = ~np.isnan(values)
+    values, groups = values[keep], groups[keep]
+    # A stable integer sort on the group ids is a radix sort, far cheaper than sorting the values
+    values = values[np.argsort(groups, kind="stable")]
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(groups, minlength=num_groups))))
+    return np.array([np.median(values[bounds[i]:bounds[i + 1]]) if bounds[i + 1] > bounds[i] else np.nan
+                     for i in range(num_groups)])
+
+def compute_question_analytics(question_ids, chosen_options, correct, latencies, respondents):
+    """Per-question accuracy, option distribution, discrimination index and time-to-answer"""
+    if len(question_ids) == 0:
+        return []
+    # Question ids are small integers, so a lookup table replaces a sort-based unique
+    seen = np.bincount(question_ids) > 0
+    questions = np.flatnonzero(seen)
+    num_questions = len(questions)
+    q = np.cumsum(seen)[question_ids] - 1
+    attempts = np.bincount(q, minlength=num_questions)
+    accuracy = np.bincount(q, weights=correct, minlength=num_questions) / attempts
+
+    valid = chosen_options >= 0
+    num_options = int(chosen_options.max()) + 1 if valid.any() else 0
+    option_counts = np.bincount(q[valid] * num_options + chosen_options[valid],
+                                minlength=num_questions * num_options).reshape(num_questions, num_options)
+
+    timed = ~np.isnan(latencies)
+    timed_counts = np.bincount(q[timed], minlength=num_questions)
+    latency_sums = np.bincount(q[timed], weights=latencies[timed], minlength=num_questions)
+    mean_latency = np.divide(latency_sums, timed_counts, out=np.full(num_questions, np.nan), where=timed_counts > 0)
+    median_latency = _grouped_median(latencies, q, num_questions)
+
+    # Discrimination index: accuracy of the top 27% of respondents minus the bottom 27%
+    num_respondents = int(respondents.max()) + 1
+    respondent_scores = (np.bincount(respondents, weights=correct, minlength=num_respondents) /
+                         np.maximum(np.bincount(respondents, minlength=num_respondents), 1))
+    group_size = max(1, int(round(num_respondents * DISCRIMINATION_GROUP_FRACTION)))
+    ranked = np.argsort(respondent_scores, kind="stable")
+    discrimination = np.full(num_questions, np.nan)
+    if num_respondents >= 2:
+        group_accuracy = []
+        for members in (ranked[-group_size:], ranked[:group_size]):
+            in_group = np.zeros(num_respondents, dtype=np.bool_)
+            in_group[members] = True
+            events = in_group[respondents]
+            group_attempts = np.bincount(q[events], minlength=num_questions)
+            group_correct = np.bincount(q[events], weights=correct[events], minlength=num_questions)
+            group_accuracy.append(np.divide(group_correct, group_attempts,
+                                            out=np.full(num_questions, np.nan), where=group_attempts > 0))
+        discrimination = group_accuracy[0] - group_accuracy[1]
+
+    def as_float(value):
+        return None if np.isnan(value) else round(float(value), 4)
+
+    return [
+        {
+            "question_id": int(questions[i]),
+            "attempts": int(attempts[i]),
+            "accuracy": as_float(accuracy[i]),
+            "option_distribution": option_counts[i].tolist(),
+            "discrimination_index": as_float(discrimination[i]),
+            "mean_time_to_answer": as_float(mean_latency[i]),
+            "median_time_to_answer": as_float(median_latency[i])
+        }
+        for i in range(num_questions)
+    ]
+
+# Personalized certificate rendering; the drawing itself runs in certificate_render
+class CertificateTemplateNotFound(Exception):
+    pass
+
+
+class CertificateRenderer:
+    """Renders certificates on a process pool, with a content-hash cache of finished images"""
+
+    def __init__(self, template_dir, output_dir, workers):
+        self.template_dir = template_dir
+        self.output_dir = output_dir
+        self.workers = workers
+        self.pool = None
+        self.template_digests = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def _get_pool(self):
+        # Called with self.lock held. Created on first use so every gunicorn worker gets its own pool.
+        # Render workers fork from a single-threaded forkserver; forking this multithreaded process
+        # directly can deadlock the child. Like spawn, each worker imports __main__ once at startup:
+        # gunicorn's guarded entry point in production, this script when run as `python StudentNFTAPI.py`.
+        if self.pool is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["certificate_render"])
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self.pool
+
+    def template_path(self, badge_type):
+        return os.path.join(self.template_dir, f"{badge_type}.png")
+
+    def _template_digest(self, template_path):
+        mtime = os.path.getmtime(template_path)
+        cached = self.template_digests.get(template_path)
+        if cached is None or cached[0] != mtime:
+            with open(template_path, "rb") as f:
+                cached = (mtime, hashlib.sha256(f.read()).hexdigest())
+            self.template_digests[template_path] = cached
+        return cached[1]
+
+    def certificate_hash(self, badge_type, fields):
+        template_path = self.template_path(badge_type)
+        key = json.dumps({
+            "template": self._template_digest(template_path),
+            "layout": [CERTIFICATE_TEXT_BAND, CERTIFICATE_TEXT_LAYOUT, CERTIFICATE_FONT],
+            "fields": fields
+        }, sort_keys=True)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def output_path(self, certificate_hash):
+        return os.path.join(self.output_dir, f"{certificate_hash}.png")
+
+    def submit(self, badge_type, fields):
+        """Start rendering; returns (certificate_hash, future, cached)"""
+        template_path = self.template_path(badge_type)
+        if not os.path.isfile(template_path):
+            raise CertificateTemplateNotFound(f"Certificate template for badge type '{badge_type}' not found.")
+        certificate_hash = self.certificate_hash(badge_type, fields)
+        output_path = self.output_path(certificate_hash)
+        if os.path.isfile(output_path):
+            return certificate_hash, None, True
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Lookup and submit under one lock so identical concurrent requests share a single render
+        with self.lock:
+            future = self.in_flight.get(certificate_hash)
+            if future is None:
+                future = self._get_pool().submit(render_certificate, template_path, fields, output_path)
+                self.in_flight[certificate_hash] = future
+                future.add_done_callback(lambda _: self.in_flight.pop(certificate_hash, None))
+        return certificate_hash, future, False
+
+    def render(self, badge_type, fields):
+        """Render one certificate and return the image path"""
+        certificate_hash, future, _ = self.submit(badge_type, fields)
+        if future is not None:
+            future.result(timeout=CERTIFICATE_RENDER_TIMEOUT)
+        return self.output_path(certificate_hash)
+
+    def render_batch(self, badge_type, students):
+        """Render a whole cohort in parallel; returns one result per student"""
+        submitted = [(fields, *self.submit(badge_type, fields)) for fields in students]
+        results = []
+        for fields, certificate_hash, future, cached in submitted:
+            result = {"student_name": fields["student_name"], "certificate_hash": certificate_hash, "cached": cached}
+            try:
+                if future is not None:
+                    future.result(timeout=CERTIFICATE_RENDER_TIMEOUT)
+            except Exception as e:
+                result["error"] = str(e)
+            results.append(result)
+        return results
+
+certificate_renderer = CertificateRenderer(CERTIFICATE_DIR, RENDERED_CERTIFICATE_DIR, CERTIFICATE_RENDER_WORKERS)
+
+# Streaming badge export
+def badge_record_matches(record, filters):
+    """Same filters as the admin UI: badge type, student, mint status and grant date range"""
+    if filters.get("badge_type") and record.get("badge_type") != filters["badge_type"]:
+        return False
+    if filters.get("student_name") and record.get("student_name") != filters["student_name"]:
+        return False
+    if filters.get("mint_status") and record.get("mint_status") != filters["mint_status"]:
+        return False
+    if filters.get("from") and record.get("grant_date", "") < filters["from"]:
+        return False
+    if filters.get("to") and record.get("grant_date", "") > filters["to"]:
+        return False
+    return True
+
+def iter_badge_export_chunks(filters):
+    """Filtered badge records in lists of at most EXPORT_CHUNK_ROWS"""
+    chunk = []
+    for record in iter_badge_log():
+        if badge_record_matches(record, filters):
+            chunk.append([record.get(column) for column in EXPORT_COLUMNS])
+            if len(chunk) == EXPORT_CHUNK_ROWS:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def stream_badges_csv(filters):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in iter_badge_export_chunks(filters):
+        writer.writerows(chunk)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
+
+def stream_badges_jsonl(filters):
+    for chunk in iter_badge_export_chunks(filters):
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in chunk)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose bytes are drained after every Parquet row group"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_badges_parquet(filters):
+    schema = pa.schema([(column, pa.int64() if column in ("tokens_used", "token_id") else pa.string())
+                        for column in EXPORT_COLUMNS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in iter_badge_export_chunks(filters):
+        columns = list(zip(*chunk))
+        writer.write_table(pa.table([pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                                    schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+BADGE_EXPORT_FORMATS = {
+    "csv": (stream_badges_csv, "text/csv"),
+    "jsonl": (stream_badges_jsonl, "application/x-ndjson"),
+    "parquet": (stream_badges_parquet, "application/vnd.apache.parquet")
+}
+
+# Admission control for expensive endpoints
+class TokenBucketLimiter:
+    """Per-key token buckets; acquire() returns 0 when admitted, else seconds until a token is available"""
+
+    def __init__(self, burst, rate, max_keys):
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return math.ceil((1 - tokens) / self.rate)
+            self.buckets[key] = (tokens - 1, now)
+            if len(self.buckets) > self.max_keys:
+                self._evict_full(now)
+            return 0
+
+    def _evict_full(self, now):
+        # A bucket that has refilled completely is the same as a missing one
+        for key, (tokens, updated) in list(self.buckets.items()):
+            if tokens + (now - updated) * self.rate >= self.burst:
+                del self.buckets[key]
+        # Still too many: forget the least recently inserted keys
+        for key in list(self.buckets)[:len(self.buckets) - self.max_keys]:
+            del self.buckets[key]
+
+
+class DependencyLimiter:
+    """Non-blocking concurrency caps for each downstream dependency"""
+
+    def __init__(self, limits):
+        self.slots = {name: threading.BoundedSemaphore(limit) for name, limit in limits.items()}
+
+    def try_acquire(self, names):
+        """Take a slot for every dependency or none; returns the name that was full, if any"""
+        acquired = []
+        for name in names:
+            if not self.slots[name].acquire(blocking=False):
+                self.release(acquired)
+                return name
+            acquired.append(name)
+        return None
+
+    def release(self, names):
+        for name in names:
+            self.slots[name].release()
+
+
+user_rate_limiter = TokenBucketLimiter(RATE_LIMIT_BURST, RATE_LIMIT_PER_SECOND, RATE_LIMIT_MAX_TRACKED_USERS)
+dependency_limiter = DependencyLimiter(DEPENDENCY_CONCURRENCY)
+
+def too_many_requests(message, retry_after):
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+def admission_control(*dependencies, per_caller=True):
+    """Reject fast with 429 when the caller is over its rate or a dependency is saturated.
+    per_caller=False skips the per-user bucket for reads that carry no user identity."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if per_caller:
+                data = request.get_json(silent=True) or {}
+                user_key = data.get("user_address") or request.args.get("user_address") or request.remote_addr
+                retry_after = user_rate_limiter.acquire(user_key)
+                if retry_after:
+                    return too_many_requests("Rate limit exceeded, please slow down", retry_after)
+            saturated = dependency_limiter.try_acquire(dependencies)
+            if saturated:
+                return too_many_requests(f"Server busy ({saturated}), please retry", DEPENDENCY_RETRY_AFTER)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                dependency_limiter.release(dependencies)
+        return wrapper
+    return decorator
+
+# Idempotency keys for non-repeatable writes
+def idempotent(view):
+    """Replay the stored response for a repeated Idempotency-Key; duplicates in flight wait for the original"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        client_key = request.headers.get("Idempotency-Key")
+        if not client_key:
+            return view(*args, **kwargs)
+        if len(client_key) > 255:
+            return jsonify({"error": "Idempotency-Key must be at most 255 characters"}), 400
+        key = f"{request.path}:{client_key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            outcome, stored = state.claim_idempotency_key(key, fingerprint, time.time())
+            if outcome == "claimed":
+                break
+            if outcome == "mismatch":
+                return jsonify({"error": "Idempotency-Key was already used for a different request"}), 422
+            if outcome == "done":
+                response_status, response_body = stored
+                return Response(response_body, status=response_status, mimetype="application/json",
+                                headers={"Idempotent-Replayed": "true"})
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return jsonify({"error": "A request with this Idempotency-Key is still in progress"}), 409
+            state.wait_idempotency_key(key, min(remaining, IDEMPOTENCY_POLL_INTERVAL))
+
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except Exception:
+            state.release_idempotency_key(key)
+            raise
+        # Only successes are remembered; after an error the same key can retry the work
+        if response.status_code == 200:
+            state.complete_idempotency_key(key, response.status_code, response.get_data())
+        else:
+            state.release_idempotency_key(key)
+        return response
+    return wrapper
+
+# Conditional GET and encoded response cache
+class ResponseBodyCache:
+    """LRU of encoded JSON bodies keyed by (path, etag), so unchanged reads skip building and encoding"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.bodies = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.bodies.get(key)
+            if body is not None:
+                self.bodies.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self.lock:
+            self.bodies[key] = body
+            self.bodies.move_to_end(key)
+            while len(self.bodies) > self.max_entries:
+                self.bodies.popitem(last=False)
+
+response_cache = ResponseBodyCache(RESPONSE_CACHE_ENTRIES)
+
+def conditional_json(version_parts, last_modified, build):
+    """Serve build() as JSON tagged by version counters; 304 when the client copy is current.
+
+    build may return pre-encoded bytes, or (payload, cacheable) to keep a partial result out of the body cache.
+    """
+    etag = hashlib.sha1(json.dumps([request.path, state.epoch, version_parts]).encode()).hexdigest()[:20]
+    last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc) if last_modified else None
+
+    if request.headers.get("If-None-Match"):
+        # Compressed variants are tagged <etag>-br / <etag>-gzip
+        not_modified = any(request.if_none_match.contains(tag) for tag in (etag, f"{etag}-br", f"{etag}-gzip"))
+    else:
+        not_modified = (last_modified is not None and request.if_modified_since is not None and
+                        last_modified <= request.if_modified_since)
+
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        cache_key = (request.path, etag)
+        body = response_cache.get(cache_key)
+        if body is None:
+            payload = build()
+            cacheable = True
+            if isinstance(payload, tuple):
+                payload, cacheable = payload
+            body = payload if isinstance(payload, bytes) else encode_json(payload)
+            if cacheable:
+                response_cache.put(cache_key, body)
+        response = app.response_class(body, mimetype="application/json")
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Negotiate br/gzip for large JSON bodies; compressed variants of tagged bodies are cached"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200 or
+            response.mimetype != "application/json" or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return response
+
+    etag, _ = response.get_etag()
+    cache_key = ("compressed", request.path, etag, encoding)
+    compressed = response_cache.get(cache_key) if etag else None
+    if compressed is None:
+        compressed = compress_body(body, encoding)
+        if etag:
+            response_cache.put(cache_key, compressed)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+# On-demand request profiling
+class StackSampler:
+    """Samples one thread's Python stack on a background thread and counts collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = defaultdict(int)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="request-stack-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.counts.items()))
+
+
+def cprofile_collapsed(stats):
+    """Caller;callee lines weighted by own time in microseconds (cProfile keeps one level of callers)"""
+    def label(func):
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+    lines = []
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, own_time, _) in callers.items():
+            if int(own_time * 1e6):
+                lines.append(f"{label(caller)};{label(func)} {int(own_time * 1e6)}")
+    return "\n".join(sorted(lines))
+
+
+class ProfileStore:
+    """Most recent request profiles, kept in memory per worker process"""
+
+    def __init__(self, max_profiles):
+        self.profiles = deque(maxlen=max_profiles)
+        self.lock = threading.Lock()
+
+    def add(self, profile):
+        with self.lock:
+            self.profiles.append(profile)
+
+    def summaries(self):
+        with self.lock:
+            return [{k: v for k, v in p.items() if k not in ("collapsed", "pstats")} for p in reversed(self.profiles)]
+
+    def get(self, profile_id):
+        with self.lock:
+            return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+profile_store = ProfileStore(PROFILES_KEPT)
+
+def profile_admin_authorized():
+    token = request.headers.get("X-Profile-Token")
+    if not PROFILE_ADMIN_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), PROFILE_ADMIN_TOKEN.encode())
+
+def start_request_profile():
+    if request.path.startswith("/admin/profiles"):
+        return
+    authorized = profile_admin_authorized()
+    if not (authorized or random.random() < PROFILE_SAMPLE_RATE):
+        return
+    # Randomly sampled requests always use the configured mode; only an admin may ask for cProfile
+    mode = request.headers.get("X-Profile-Mode", PROFILE_MODE) if authorized else PROFILE_MODE
+    if mode == "cprofile":
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    else:
+        mode = "sample"
+        g.profiler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+        g.profiler.start()
+    g.profile_mode = mode
+    g.profile_started = time.perf_counter()
+
+def finish_request_profile(exc):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+    duration_ms = (time.perf_counter() - g.profile_started) * 1000
+    profile = {
+        "id": uuid.uuid4().hex,
+        "route": request.url_rule.rule if request.url_rule else None,
+        "method": request.method,
+        "path": request.path,
+        "mode": g.profile_mode,
+        "duration_ms": round(duration_ms, 2),
+        "captured_at": datetime.now().isoformat(),
+        "error": str(exc) if exc else None
+    }
+    if g.profile_mode == "cprofile":
+        profiler.disable()
+        profiler.create_stats()
+        profile["collapsed"] = cprofile_collapsed(profiler.stats)
+        profile["pstats"] = marshal.dumps(profiler.stats)
+    else:
+        profiler.stop()
+        profile["collapsed"] = profiler.collapsed()
+    profile_store.add(profile)
+
+# Only hook requests when profiling is configured, so it costs nothing when off
+if PROFILING_ENABLED:
+    app.before_request(start_request_profile)
+    app.teardown_request(finish_request_profile)
+
+# IPFS gateway pool with hedged fetches
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+UNIXFS_CHUNK_SIZE = 262144
+
+def _base58_decode(text):
+    number = 0
+    for char in text:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    return b"\x00" * (len(text) - len(text.lstrip("1"))) + raw
+
+def _varint(number):
+    out = bytearray()
+    while True:
+        byte = number & 0x7F
+        number >>= 7
+        out.append(byte | (0x80 if number else 0))
+        if not number:
+            return bytes(out)
+
+def _read_varint(data, pos):
+    number = shift = 0
+    while True:
+        byte = data[pos]
+        number |= (byte & 0x7F) << shift
+        pos += 1
+        shift += 7
+        if not byte & 0x80:
+            return number, pos
+
+def _unixfs_file_block(content):
+    """dag-pb node that `ipfs add` produces for a single-chunk file"""
+    unixfs = b"\x08\x02"
+    if content:
+        unixfs += b"\x12" + _varint(len(content)) + content
+    unixfs += b"\x18" + _varint(len(content))
+    return b"\x0a" + _varint(len(unixfs)) + unixfs
+
+def verify_ipfs_content(ipfs_path, content):
+    """True/False when the bytes can be checked against the CID, None when they cannot
+    (paths inside a directory, multi-chunk files, non-sha256 hashes)"""
+    cid, _, subpath = ipfs_path.partition("/")
+    if subpath or len(content) > UNIXFS_CHUNK_SIZE:
+        return None
+    try:
+        if cid.startswith("Qm"):
+            codec, multihash = 0x70, _base58_decode(cid)
+        elif cid.startswith("b"):
+            raw = base64.b32decode(cid[1:].upper() + "=" * (-len(cid[1:]) % 8))
+            version, pos = _read_varint(raw, 0)
+            codec, pos = _read_varint(raw, pos)
+            if version != 1:
+                return None
+            multihash = raw[pos:]
+        else:
+            return None
+    except (ValueError, IndexError):
+        return False
+    if multihash[:2] != b"\x12\x20":
+        return None
+    if codec == 0x55:
+        block = content
+    elif codec == 0x70:
+        block = _unixfs_file_block(content)
+    else:
+        return None
+    return hashlib.sha256(block).digest() == multihash[2:]
+
+
+class HTTPGateway:
+    """IPFS HTTP gateway serving <base_url>/<cid>[/path]; any object with name and fetch() can stand in"""
+
+    def __init__(self, base_url):
+        self.name = base_url
+        self.base_url = base_url.rstrip("/")
+
+    def fetch(self, ipfs_path, timeout):
+        response = requests.get(f"{self.base_url}/{ipfs_path}", timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+
+class GatewayStats:
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=GATEWAY_LATENCY_WINDOW)
+
+    def record(self, latency, ok):
+        self.error_rate += GATEWAY_EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.latency = latency if self.latency is None else self.latency + GATEWAY_EWMA_ALPHA * (latency - self.latency)
+            self.samples.append(latency)
+
+    def score(self):
+        # Untried gateways look average so they get explored; errors weigh heavily
+        latency = self.latency if self.latency is not None else GATEWAY_HEDGE_DEFAULT_DELAY
+        return latency * (1 + 4 * self.error_rate)
+
+    def hedge_delay(self):
+        if len(self.samples) < 5:
+            return GATEWAY_HEDGE_DEFAULT_DELAY
+        return max(GATEWAY_HEDGE_MIN_DELAY, float(np.percentile(self.samples, GATEWAY_HEDGE_PERCENTILE)))
+
+
+class GatewayPool:
+    """Routes /ipfs/<cid> reads to the best gateway and hedges to the next one past its latency percentile"""
+
+    def __init__(self, gateways, timeout):
+        self.gateways = gateways
+        self.timeout = timeout
+        self.stats = {gateway.name: GatewayStats() for gateway in gateways}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=GATEWAY_FETCH_WORKERS, thread_name_prefix="ipfs-gateway")
+
+    def ranked(self):
+        with self.lock:
+            return sorted(self.gateways, key=lambda gateway: self.stats[gateway.name].score())
+
+    def _attempt(self, gateway, ipfs_path, validate):
+        started = time.monotonic()
+        try:
+            content = gateway.fetch(ipfs_path, self.timeout)
+            verified = verify_ipfs_content(ipfs_path, content)
+            if verified is False or (verified is None and validate is not None and not validate(content)):
+                raise ValueError(f"Content from {gateway.name} does not match {ipfs_path}")
+        except Exception:
+            with self.lock:
+                self.stats[gateway.name].record(time.monotonic() - started, False)
+            raise
+        with self.lock:
+            self.stats[gateway.name].record(time.monotonic() - started, True)
+        return content
+
+    def fetch(self, ipfs_path, validate=None):
+        """Bytes for <cid>[/path]; the first verified answer wins, validate() vets what the CID cannot"""
+        remaining = self.ranked()
+        deadline = time.monotonic() + self.timeout
+        pending = set()
+        errors = []
+        while remaining or pending:
+            if remaining:
+                gateway = remaining.pop(0)
+                pending.add(self.executor.submit(self._attempt, gateway, ipfs_path, validate))
+                with self.lock:
+                    hedge_after = self.stats[gateway.name].hedge_delay()
+            else:
+                hedge_after = None
+            wait_for = deadline - time.monotonic() if hedge_after is None else min(hedge_after, deadline - time.monotonic())
+            if wait_for <= 0:
+                break
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                errors.append(str(future.exception()))
+            # Nothing back yet (or only failures): fall through and hedge to the next gateway
+        raise requests.RequestException(f"All gateways failed for {ipfs_path}: {errors or 'timed out'}")
+
+    def fetch_uri(self, uri, validate=None):
+        """Fetch a gateway URL, rewriting /ipfs/<cid> URIs across the pool"""
+        marker = uri.find("/ipfs/")
+        if marker == -1:
+            response = requests.get(uri, timeout=self.timeout)
+            response.raise_for_status()
+            return response.content
+        return self.fetch(uri[marker + len("/ipfs/"):], validate)
+
+    def snapshot(self):
+        with self.lock:
+            return [{
+                "gateway": gateway.name,
+                "latency_ewma_ms": round(stats.latency * 1000, 1) if stats.latency is not None else None,
+                "error_rate": round(stats.error_rate, 3),
+                "hedge_delay_ms": round(stats.hedge_delay() * 1000, 1)
+            } for gateway, stats in ((g, self.stats[g.name]) for g in self.gateways)]
+
+def is_json_document(content):
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
+
+gateway_pool = GatewayPool([HTTPGateway(url) for url in IPFS_GATEWAYS], GATEWAY_TIMEOUT)
+
+# Quiz push channel
+class SessionChangeNotifier:
+    """Wakes the quiz channel streams of one session in this process as soon as its answer is graded"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}  # session_id -> [condition, generation, subscribers]
+
+    def subscribe(self, session_id):
+        with self.lock:
+            entry = self.sessions.setdefault(session_id, [threading.Condition(self.lock), 0, 0])
+            entry[2] += 1
+
+    def unsubscribe(self, session_id):
+        with self.lock:
+            entry = self.sessions[session_id]
+            entry[2] -= 1
+            if entry[2] == 0:
+                del self.sessions[session_id]
+
+    def generation(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            return entry[1] if entry else 0
+
+    def notify(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is not None:
+                entry[1] += 1
+                entry[0].notify_all()
+
+    def wait(self, session_id, seen_generation, timeout):
+        # Answers graded by other workers are picked up when the timeout lapses
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is not None:
+                entry[0].wait_for(lambda: entry[1] != seen_generation, timeout)
+
+session_notifier = SessionChangeNotifier()
+
+def question_body(session):
+    """JSON bytes for the session's current question, built from the pre-encoded question text"""
+    current_q = session["questions"][session["current_question"]]
+    return b'{"question_number":%d,"total_questions":%d,%s}' % (
+        session["current_question"] + 1, session["total_questions"], PRE_ENCODED_QUESTIONS[current_q["id"]])
+
+def quiz_channel_event(session_id, session, tokens):
+    """One SSE event with the last grading result, the balance and the next question"""
+    quiz_completed = session["current_question"] >= len(session["questions"])
+    event = {
+        "session_id": session_id,
+        "answered": session.get("last_result"),
+        "total_tokens": tokens,
+        "eligible": tokens >= MINIMUM_TOKENS_FOR_NFT,
+        "tokens_needed": max(0, MINIMUM_TOKENS_FOR_NFT - tokens),
+        "quiz_completed": quiz_completed
+    }
+    if quiz_completed:
+        event.update({
+            "final_score": f"{session['correct_answers']}/{session['total_questions']}",
+            "total_tokens_earned": session["correct_answers"] * TOKENS_PER_CORRECT_ANSWER,
+            "can_mint_nft": tokens >= MINIMUM_TOKENS_FOR_NFT
+        })
+    question = b"null" if quiz_completed else question_body(session)
+    data = encode_json(event)[:-1] + b',"question":' + question + b"}"
+    return b"id: %d\nevent: quiz\ndata: %s\n\n" % (session["current_question"], data)
+
 # NEW QUIZ-RELATED ENDPOINTS
 
 @app.route("/initialize_user", methods=["POST"])
@@ -221,8 +2329,8 @@ def initialize_user():
 @app.route("/get_user_balance/<user_address>", methods=["GET"])
 def get_user_balance(user_address):
     """Get current token balance for a user"""
-    tokens = get_user_tokens(user_address)
-    return jsonify({
+    tokens, version, updated_at = state.get_balance_state(user_address)
+    return conditional_json(["balance", user_address, version], updated_at, lambda: {
         "user_address": user_address,
         "tokens": tokens
     })
@@ -241,7 +2349,7 @@ def start_quiz():
     
     # Create quiz session
     session_id = f"{user_address}_{datetime.now().timestamp()}"
-    user_sessions[session_id] = {
+    session = {
         "user_address": user_address,
         "questions": random.sample(QUIZ_QUESTIONS, min(5, len(QUIZ_QUESTIONS))),
         "current_question": 0,
@@ -249,32 +2357,32 @@ def start_quiz():
         "total_questions": min(5, len(QUIZ_QUESTIONS)),
         "started_at": datetime.now().isoformat()
     }
+    state.save_session(session_id, session)
     
     return jsonify({
         "session_id": session_id,
-        "total_questions": user_sessions[session_id]["total_questions"],
+        "total_questions": session["total_questions"],
         "message": "Quiz session started successfully"
     })
 
 @app.route("/get_question/<session_id>", methods=["GET"])
 def get_question(session_id):
     """Get current question for a quiz session"""
-    if session_id not in user_sessions:
+    session = state.get_session(session_id)
+    if session is None:
         return jsonify({"error": "Invalid session ID"}), 400
     
-    session = user_sessions[session_id]
-    
     if session["current_question"] >= len(session["questions"]):
         return jsonify({"error": "Quiz completed"}), 400
     
-    current_q = session["questions"][session["current_question"]]
+    # Time-to-answer starts when a question is first served, not on every poll
+    if session.get("served_question") != session["current_question"]:
+        session["served_question"] = session["current_question"]
+        session["served_at"] = time.time()
+        state.save_session(session_id, session)
     
-    return jsonify({
-        "question_number": session["current_question"] + 1,
-        "total_questions": session["total_questions"],
-        "question": current_q["question"],
-        "options": current_q["options"]
-    })
+    return conditional_json(["session", session_id, session["version"]], session.get("updated_at"),
+                            lambda: question_body(session))
 
 @app.route("/submit_answer", methods=["POST"])
 def submit_answer():
@@ -283,13 +2391,16 @@ def submit_answer():
     session_id = data.get("session_id")
     answer = data.get("answer")  # 0-based index
     
-    if session_id not in user_sessions:
+    session = state.get_session(session_id)
+    if session is None:
         return jsonify({"error": "Invalid session ID"}), 400
     
     if answer is None:
         return jsonify({"error": "Answer is required"}), 400
     
-    session = user_sessions[session_id]
+    if session["current_question"] >= len(session["questions"]):
+        return jsonify({"error": "Quiz completed"}), 400
+    
     current_q = session["questions"][session["current_question"]]
     
     is_correct = answer == current_q["correct_answer"]
@@ -298,9 +2409,26 @@ def submit_answer():
     if is_correct:
         session["correct_answers"] += 1
         tokens_earned = TOKENS_PER_CORRECT_ANSWER
-        add_tokens(session["user_address"], tokens_earned)
     
     session["current_question"] += 1
+    session["last_result"] = {
+        "question_number": session["current_question"],
+        "correct": is_correct,
+        "correct_answer": current_q["correct_answer"],
+        "tokens_earned": tokens_earned
+    }
+    
+    # Another worker may have graded this question already (double submit)
+    if not state.save_session(session_id, session):
+        return jsonify({"error": "Answer already submitted for this question"}), 409
+    
+    if tokens_earned:
+        add_tokens(session["user_address"], tokens_earned)
+    session_notifier.notify(session_id)
+    
+    served_at = session.get("served_at") if session.get("served_question") == session["current_question"] - 1 else None
+    state.record_answer_event(session_id, current_q["id"], answer, is_correct,
+                              time.time() - served_at if served_at else None)
     
     # Check if quiz is completed
     quiz_completed = session["current_question"] >= len(session["questions"])
@@ -314,6 +2442,8 @@ def submit_answer():
     }
     
     if quiz_completed:
+        state.record_quiz_score(session["user_address"],
+                                session["correct_answers"] * TOKENS_PER_CORRECT_ANSWER, datetime.now())
         response.update({
             "final_score": f"{session['correct_answers']}/{session['total_questions']}",
             "total_tokens_earned": session["correct_answers"] * TOKENS_PER_CORRECT_ANSWER,
@@ -325,14 +2455,16 @@ def submit_answer():
 @app.route("/quiz_summary/<session_id>", methods=["GET"])
 def quiz_summary(session_id):
     """Get quiz session summary"""
-    if session_id not in user_sessions:
+    session = state.get_session(session_id)
+    if session is None:
         return jsonify({"error": "Invalid session ID"}), 400
     
-    session = user_sessions[session_id]
     user_address = session["user_address"]
-    current_tokens = get_user_tokens(user_address)
+    current_tokens, balance_version, balance_updated_at = state.get_balance_state(user_address)
     
-    return jsonify({
+    versions = ["session", session_id, session["version"], "balance", balance_version]
+    last_modified = max(session.get("updated_at") or 0, balance_updated_at or 0)
+    return conditional_json(versions, last_modified, lambda: {
         "session_id": session_id,
         "user_address": user_address,
         "correct_answers": session["correct_answers"],
@@ -343,15 +2475,200 @@ def quiz_summary(session_id):
         "tokens_needed_for_nft": max(0, MINIMUM_TOKENS_FOR_NFT - current_tokens)
     })
 
+@app.route("/quiz_channel/<session_id>", methods=["GET"])
+def quiz_channel(session_id):
+    """Server-Sent Events stream pushing the result, balance and next question after every answer"""
+    if state.get_session(session_id) is None:
+        return jsonify({"error": "Invalid session ID"}), 400
+
+    def events():
+        emitted_question = None
+        balance_version = None
+        credit_wait_started = None
+        last_sent = started = time.monotonic()
+        while time.monotonic() - started < QUIZ_CHANNEL_MAX_SECONDS:
+            seen_generation = session_notifier.generation(session_id)
+            session = state.get_session(session_id)
+            if session is None:
+                return
+            if session["current_question"] != emitted_question:
+                tokens, version, _ = state.get_balance_state(session["user_address"])
+                result = session.get("last_result")
+                # A correct answer graded by another worker is saved just before its tokens are credited
+                credited = emitted_question is None or not (result and result["tokens_earned"]) or version != balance_version
+                if not credited and credit_wait_started is None:
+                    credit_wait_started = time.monotonic()
+                if credited or time.monotonic() - credit_wait_started >= QUIZ_CHANNEL_CREDIT_WAIT:
+                    yield quiz_channel_event(session_id, session, tokens)
+                    if session["current_question"] >= len(session["questions"]):
+                        return
+                    emitted_question = session["current_question"]
+                    balance_version = version
+                    credit_wait_started = None
+                    last_sent = time.monotonic()
+                    # Time-to-answer starts now, as it does for get_question
+                    if session.get("served_question") != emitted_question:
+                        session["served_question"] = emitted_question
+                        session["served_at"] = time.time()
+                        state.save_session(session_id, session)
+            if time.monotonic() - last_sent >= QUIZ_CHANNEL_KEEPALIVE_SECONDS:
+                yield b": keepalive\n\n"
+                last_sent = time.monotonic()
+            session_notifier.wait(session_id, seen_generation, QUIZ_CHANNEL_POLL_INTERVAL)
+
+    def stream():
+        session_notifier.subscribe(session_id)
+        try:
+            yield from events()
+        finally:
+            session_notifier.unsubscribe(session_id)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route("/leaderboard", methods=["GET"])
+def leaderboard():
+    """Top students by token balance or by quiz points earned in a period"""
+    board = request.args.get("board", "tokens")
+    period = request.args.get("period", "all")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), LEADERBOARD_MAX_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    if board == "tokens":
+        rows = state.top_tokens(limit)
+    elif board == "quiz":
+        if period not in LEADERBOARD_PERIODS:
+            return jsonify({"error": f"period must be one of {LEADERBOARD_PERIODS}"}), 400
+        rows = state.top_quiz_scores(leaderboard_period_keys(datetime.now())[period], limit)
+    else:
+        return jsonify({"error": "board must be 'tokens' or 'quiz'"}), 400
+
+    return jsonify({
+        "board": board,
+        "period": period if board == "quiz" else "all",
+        "leaders": [
+            {
+                "rank": rank,
+                "user_address": user_address,
+                "student_name": state.roster_name(user_address) or "N/A",
+                "score": score
+            }
+            for rank, (user_address, score) in enumerate(rows, start=1)
+        ]
+    })
+
+@app.route("/analytics/questions", methods=["GET"])
+def question_analytics():
+    """Per-question accuracy, option distribution, discrimination and timing report"""
+    columns = state.answer_event_columns()
+    report = compute_question_analytics(*columns)
+    questions_by_id = {q["id"]: q for q in QUIZ_QUESTIONS}
+    for row in report:
+        question = questions_by_id.get(row["question_id"])
+        if question:
+            row["question"] = question["question"]
+            row["correct_answer"] = question["correct_answer"]
+            row["option_distribution"] = (row["option_distribution"] + [0] * len(question["options"]))[:len(question["options"])]
+    return jsonify({"total_answers": len(columns[0]), "questions": report})
+
+# ROSTER ENDPOINTS
+
+def parse_roster_upload():
+    """Read (name, address) pairs from a JSON body or a CSV upload/body"""
+    upload = request.files.get("roster")
+    if upload is not None or request.mimetype == "text/csv":
+        text = upload.read().decode("utf-8-sig") if upload is not None else request.get_data(as_text=True)
+        return [(row["student_name"].strip(), row["user_address"].strip()) for row in csv.DictReader(io.StringIO(text))]
+    data = request.get_json()
+    students = data
+    if isinstance(data, dict) and "students" in data:
+        students = data["students"]
+    # A bare {name: address} object, as in StudentWalletMapping.json
+    if isinstance(students, dict):
+        return list(students.items())
+    return [(row["student_name"], row["user_address"]) for row in students]
+
+@app.route("/roster/import", methods=["POST"])
+def import_roster():
+    """Bulk import a roster and initialize every balance in one transaction"""
+    try:
+        students = parse_roster_upload()
+    except (KeyError, TypeError, AttributeError, UnicodeDecodeError):
+        return jsonify({"error": "Roster must have student_name and user_address for every row"}), 400
+
+    invalid = [name for name, address in students if not name or not Web3.is_address(address)]
+    if invalid:
+        return jsonify({"error": "Invalid roster rows", "students": invalid[:20]}), 400
+
+    initialize_balances = request.args.get("initialize_balances", "true").lower() != "false"
+    state.import_roster(students, INITIAL_USER_TOKENS if initialize_balances else None)
+    return jsonify({
+        "imported": len(students),
+        "roster_size": state.roster_count(),
+        "message": f"Imported {len(students)} students"
+    })
+
+def roster_limit(default=50):
+    return max(1, min(int(request.args.get("limit", default)), ROSTER_MAX_PAGE_SIZE))
+
+@app.route("/roster", methods=["GET"])
+def list_roster():
+    """Paginated roster, ordered by student name"""
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = roster_limit()
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    return jsonify({
+        "total": state.roster_count(),
+        "offset": offset,
+        "students": [{"student_name": name, "user_address": address}
+                     for name, address in state.roster_page(offset, limit)]
+    })
+
+@app.route("/roster/search", methods=["GET"])
+def search_roster():
+    """Case-insensitive prefix search over student names"""
+    try:
+        limit = roster_limit()
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    prefix = request.args.get("prefix", "")
+    return jsonify({
+        "prefix": prefix,
+        "students": [{"student_name": name, "user_address": address}
+                     for name, address in state.roster_search(prefix, limit)]
+    })
+
+@app.route("/roster/student/<path:student_name>", methods=["GET"])
+def roster_student(student_name):
+    """Forward lookup from student name to wallet address"""
+    user_address = state.roster_address(student_name)
+    if user_address is None:
+        return jsonify({"error": "Student not found"}), 404
+    return jsonify({"student_name": student_name, "user_address": user_address})
+
+@app.route("/roster/address/<user_address>", methods=["GET"])
+def roster_address(user_address):
+    """Reverse lookup from wallet address to student name"""
+    student_name = state.roster_name(user_address)
+    if student_name is None:
+        return jsonify({"error": "Address not found"}), 404
+    return jsonify({"student_name": student_name, "user_address": user_address})
+
 # MODIFIED NFT MINTING ENDPOINTS
 
 @app.route("/check_nft_eligibility/<user_address>", methods=["GET"])
 def check_nft_eligibility(user_address):
     """Check if user is eligible to mint NFT"""
-    current_tokens = get_user_tokens(user_address)
+    current_tokens, version, updated_at = state.get_balance_state(user_address)
     eligible = current_tokens >= MINIMUM_TOKENS_FOR_NFT
     
-    return jsonify({
+    return conditional_json(["balance", user_address, version], updated_at, lambda: {
         "eligible": eligible,
         "current_tokens": current_tokens,
         "required_tokens": MINIMUM_TOKENS_FOR_NFT,
@@ -359,6 +2676,8 @@ def check_nft_eligibility(user_address):
     })
 
 @app.route("/mintBadge", methods=["POST"])
+@idempotent
+@admission_control("rpc")
 def mintBadge():
     """Modified mint badge function with token validation"""
     data = request.get_json()
@@ -384,28 +2703,67 @@ def mintBadge():
             return jsonify({"error": "Failed to deduct tokens"}), 400
 
         nonce = get_nonce(accountAddress)
-        txn = contract.functions.mintBadge(recipient, badge_type, token_uri).build_transaction({
+        txn_params = {
             "from": accountAddress,
-            "nonce": nonce,
-            "gas": 300000,
-            "gasPrice": web3.to_wei("2", "gwei")
-        })
+            "nonce": nonce
+        }
+        txn_params.update(fee_strategy.transaction_params(badge_type, token_uri))
+        txn = contract.functions.mintBadge(recipient, badge_type, token_uri).build_transaction(txn_params)
 
         signed_txn = web3.eth.account.sign_transaction(txn, private_key=privateKey)
         tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        
-        return jsonify({
-            "tx_hash": web3.to_hex(tx_hash),
-            "tokens_deducted": MINIMUM_TOKENS_FOR_NFT,
-            "remaining_tokens": get_user_tokens(user_address),
-            "message": "NFT minted successfully!"
-        })
     except Exception as e:
         # Refund tokens if minting failed
         add_tokens(user_address, MINIMUM_TOKENS_FOR_NFT)
         return jsonify({"error": str(e)}), 400
 
+    # From here the refund (if the mint reverts) is the watcher's job
+    tx_hash = web3.to_hex(tx_hash)
+    state.record_mint_charge(tx_hash, user_address, token_uri, MINIMUM_TOKENS_FOR_NFT)
+    mint_watcher.track(tx_hash, {
+        "user_address": user_address,
+        "recipient": recipient,
+        "badge_type": badge_type,
+        "token_uri": token_uri,
+        "tokens_deducted": MINIMUM_TOKENS_FOR_NFT
+    })
+
+    return jsonify({
+        "tx_hash": tx_hash,
+        "mint_status": "pending",
+        "tokens_deducted": MINIMUM_TOKENS_FOR_NFT,
+        "remaining_tokens": get_user_tokens(user_address),
+        "message": "NFT mint submitted successfully!"
+    })
+
+@app.route("/reconcile", methods=["POST"])
+@admission_control("rpc")
+def reconcile():
+    """Compare new BadgeMinted events with the badge log and token deductions"""
+    try:
+        report = badge_reconciler.run()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report)
+
+@app.route("/mint_status/<tx_hash>", methods=["GET"])
+def mint_status(tx_hash):
+    """Get the outcome of a submitted mint transaction"""
+    outcome = mint_watcher.status(tx_hash)
+    if outcome is None:
+        # Submitted by another worker; fall back to what was published in the badge log
+        for record in read_badge_log():
+            if record.get("tx_hash") == tx_hash:
+                outcome = {"tx_hash": tx_hash, "status": record.get("mint_status"),
+                           "token_id": record.get("token_id")}
+                break
+    if outcome is None:
+        return jsonify({"error": "Unknown transaction hash"}), 404
+    return jsonify(outcome)
+
 @app.route("/uploadMetadata", methods=["POST"])  
+@idempotent
+@admission_control("pinata")
 def upload_metadata():
     """Modified metadata upload with token validation"""
     data = request.json
@@ -430,33 +2788,29 @@ def upload_metadata():
     now = datetime.now()
     grant_date = now.strftime("%Y-%m-%d")
 
-    # Upload static image
-    baseDir = Path(__file__).parent.resolve()
-    imageFileName = f"{badge_type}.PNG"
-    image_path = imageFileName
-    
-    if not os.path.isfile(image_path):
+    # Render the personalized certificate (cached by content hash, so re-issues are free)
+    try:
+        image_path = certificate_renderer.render(badge_type, {
+            "student_name": student_name,
+            "class_semester": class_semester,
+            "university": university,
+            "grant_date": grant_date
+        })
+    except CertificateTemplateNotFound:
         return jsonify({"error": f"Image for badge type '{badge_type}' not found."}), 400
+    except Exception as e:
+        return jsonify({"error": f"Certificate rendering failed: {e}"}), 500
     
     # Upload Certificate PNG file to Pinata
-    image_cid = uploadFileToPinata(filePath=str(image_path), name=str(image_path), keyValues={"category": "Badge"})
+    image_cid = uploadFileToPinata(filePath=str(image_path), name=f"{student_name}-{badge_type}.png",
+                                   keyValues={"category": "Badge"})
 
-    image_url = f"https://gateway.pinata.cloud/ipfs/{image_cid['cid']}"
+    image_url = f"{IPFS_GATEWAY_URL}/{image_cid['cid']}"
     s = pyshorteners.Shortener()
     short_url = s.tinyurl.short(image_url)
 
-    pinContent = {
-        "image_cid": image_cid['cid'],
-        "certificate_url": short_url,
-        "attributes": [
-            {"Student": student_name},
-            {"Class": class_semester},
-            {"University": university},
-            {"Date": grant_date},
-            {"Badge Type": badge_type},
-            {"Tokens Used": MINIMUM_TOKENS_FOR_NFT}
-        ]
-    }
+    pinContent = badge_pin_content({"image_cid": image_cid['cid']}, short_url, student_name, class_semester,
+                                   university, grant_date, badge_type)
     
     metadata = {
         "pinataMetadata": {"name": f"{student_name}-{badge_type}"},
@@ -465,7 +2819,7 @@ def upload_metadata():
 
     # Upload metadata JSON to Pinata
     metaDataCid = uploadMetadataToPinata(metadata)
-    metadataURL = f"https://gateway.pinata.cloud/ipfs/{metaDataCid}"
+    metadataURL = f"{IPFS_GATEWAY_URL}/{metaDataCid}"
     
     # Save to local JSON log
     record = {
@@ -479,19 +2833,167 @@ def upload_metadata():
         "tokens_used": MINIMUM_TOKENS_FOR_NFT
     }
 
-    local_log_path = STUDENT_BADGE_DATA
-    if os.path.exists(local_log_path):
-        with open(local_log_path, "r") as f:
-            badge_data = json.load(f)
-    else:
-        badge_data = []
+    append_badge_log([record])
+
+    return jsonify({"metadata_uri": metadataURL}), 200
 
-    badge_data.append(record)
+@app.route("/uploadMetadataBatch", methods=["POST"])
+@admission_control("pinata")
+def upload_metadata_batch():
+    """Award a badge to a cohort: certificates and metadata are each pinned as one IPFS directory"""
+    data = request.get_json()
+    badge_type = data.get("badge_type")
+    students = data.get("students")
+    required_fields = ["student_name", "class_semester", "university", "user_address"]
 
-    with open(local_log_path, "w") as f:
-        json.dump(badge_data, f, indent=2)
+    if not badge_type or not isinstance(students, list) or not students:
+        return jsonify({"error": "badge_type and a non-empty list of students are required"}), 400
+    if not all(isinstance(s, dict) and all(field in s for field in required_fields) for s in students):
+        return jsonify({"error": f"Each student needs {required_fields}"}), 400
 
-    return jsonify({"metadata_uri": metadataURL}), 200
+    eligible, skipped = [], []
+    for student in students:
+        current_tokens = get_user_tokens(student["user_address"])
+        if current_tokens < MINIMUM_TOKENS_FOR_NFT:
+            skipped.append({"student_name": student["student_name"], "user_address": student["user_address"],
+                            "error": f"Insufficient tokens. Has {current_tokens}, needs {MINIMUM_TOKENS_FOR_NFT}"})
+        else:
+            eligible.append(student)
+    if not eligible:
+        return jsonify({"error": "No eligible students in batch", "skipped": skipped}), 400
+
+    grant_date = datetime.now().strftime("%Y-%m-%d")
+    batch_name = f"{badge_type}-{grant_date}-{uuid.uuid4().hex[:8]}"
+    cohort = [{field: s[field] for field in ("student_name", "class_semester", "university")} for s in eligible]
+    for fields in cohort:
+        fields["grant_date"] = grant_date
+
+    try:
+        rendered = certificate_renderer.render_batch(badge_type, cohort)
+    except CertificateTemplateNotFound:
+        return jsonify({"error": f"Image for badge type '{badge_type}' not found."}), 400
+    failed = [r for r in rendered if "error" in r]
+    if failed:
+        return jsonify({"error": "Certificate rendering failed", "certificates": failed}), 500
+
+    # One directory pin for all certificate images...
+    base_names = [f"{i:04d}-{safe_file_name(s['student_name'])}" for i, s in enumerate(eligible)]
+    images = {}
+    for base_name, result in zip(base_names, rendered):
+        with open(certificate_renderer.output_path(result["certificate_hash"]), "rb") as f:
+            images[f"{base_name}.png"] = f.read()
+    image_dir_cid = pinDirectoryToPinata(f"{batch_name}-certificates", images, "image/png", {"category": "Badge"})
+
+    # ...and one for all metadata documents
+    documents = {}
+    for base_name, student in zip(base_names, eligible):
+        # Pinata only returns the directory CID, so the image is addressed by its path inside it
+        image_path = f"{image_dir_cid}/{base_name}.png"
+        documents[f"{base_name}.json"] = json.dumps(badge_pin_content(
+            {"image_path": image_path}, f"{IPFS_GATEWAY_URL}/{image_path}", student["student_name"],
+            student["class_semester"], student["university"], grant_date, badge_type)).encode()
+    metadata_dir_cid = pinDirectoryToPinata(f"{batch_name}-metadata", documents)
+
+    results, records = [], []
+    for base_name, student in zip(base_names, eligible):
+        metadata_uri = f"{IPFS_GATEWAY_URL}/{metadata_dir_cid}/{base_name}.json"
+        results.append({
+            "student_name": student["student_name"],
+            "user_address": student["user_address"],
+            "metadata_uri": metadata_uri,
+            "image_uri": f"{IPFS_GATEWAY_URL}/{image_dir_cid}/{base_name}.png"
+        })
+        records.append({
+            "student_name": student["student_name"],
+            "class_semester": student["class_semester"],
+            "university": student["university"],
+            "badge_type": badge_type,
+            "grant_date": grant_date,
+            "metadata_uri": metadata_uri,
+            "user_address": student["user_address"],
+            "tokens_used": MINIMUM_TOKENS_FOR_NFT
+        })
+    append_badge_log(records)
+
+    return jsonify({
+        "metadata_dir_cid": metadata_dir_cid,
+        "image_dir_cid": image_dir_cid,
+        "badges": results,
+        "skipped": skipped
+    }), 200
+
+@app.route("/certificates/render_batch", methods=["POST"])
+def render_certificate_batch():
+    """Render certificates for a whole cohort"""
+    data = request.get_json()
+    badge_type = data.get("badge_type")
+    students = data.get("students")
+    grant_date = data.get("grant_date", datetime.now().strftime("%Y-%m-%d"))
+    required_fields = ["student_name", "class_semester", "university"]
+
+    if not badge_type or not isinstance(students, list):
+        return jsonify({"error": "badge_type and a list of students are required"}), 400
+    if not all(isinstance(s, dict) and all(field in s for field in required_fields) for s in students):
+        return jsonify({"error": f"Each student needs {required_fields}"}), 400
+
+    cohort = [dict({field: s[field] for field in required_fields}, grant_date=grant_date) for s in students]
+    try:
+        results = certificate_renderer.render_batch(badge_type, cohort)
+    except CertificateTemplateNotFound as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"badge_type": badge_type, "certificates": results})
+
+@app.route("/certificates/<certificate_hash>", methods=["GET"])
+def get_certificate(certificate_hash):
+    """Download a rendered certificate image"""
+    if not all(c in "0123456789abcdef" for c in certificate_hash):
+        return jsonify({"error": "Invalid certificate hash"}), 400
+    path = certificate_renderer.output_path(certificate_hash)
+    if not os.path.isfile(path):
+        return jsonify({"error": "Certificate not found"}), 404
+    return send_file(os.path.abspath(path), mimetype="image/png")
+
+@app.route("/badges/export", methods=["GET"])
+def export_badges():
+    """Stream badge records as CSV, Parquet or JSON Lines with constant memory"""
+    export_format = request.args.get("format", "csv")
+    if export_format not in BADGE_EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {sorted(BADGE_EXPORT_FORMATS)}"}), 400
+    if export_format == "parquet" and pa is None:
+        return jsonify({"error": "Parquet export requires pyarrow to be installed"}), 400
+
+    filters = {key: request.args.get(key) for key in ("badge_type", "student_name", "mint_status", "from", "to")}
+    stream, mimetype = BADGE_EXPORT_FORMATS[export_format]
+    return Response(stream_with_context(stream(filters)), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=student_badges.{export_format}"
+    })
+
+# PROFILING ENDPOINTS
+
+@app.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    """List captured request profiles, newest first"""
+    if not profile_admin_authorized():
+        return jsonify({"error": "Valid X-Profile-Token header required"}), 403
+    return jsonify({"profiles": profile_store.summaries()})
+
+@app.route("/admin/profiles/<profile_id>", methods=["GET"])
+def download_profile(profile_id):
+    """Download a profile as collapsed stacks (flamegraph.pl / speedscope) or raw pstats"""
+    if not profile_admin_authorized():
+        return jsonify({"error": "Valid X-Profile-Token header required"}), 403
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if request.args.get("format") == "pstats":
+        if "pstats" not in profile:
+            return jsonify({"error": "pstats are only captured in cprofile mode"}), 400
+        return Response(profile["pstats"], mimetype="application/octet-stream", headers={
+            "Content-Disposition": f"attachment; filename={profile_id}.pstats"
+        })
+    return Response(profile["collapsed"] + "\n", mimetype="text/plain", headers={
+        "Content-Disposition": f"attachment; filename={profile_id}.folded"
+    })
 
 # EXISTING ENDPOINTS (unchanged)
 @app.route("/canmint/<badge_type>", methods=["GET"])
@@ -516,45 +3018,53 @@ def mintedCount(badge_type):
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route("/gateways", methods=["GET"])
+def gateway_stats():
+    """Latency and error rate tracked for each IPFS gateway"""
+    return jsonify({"gateways": gateway_pool.snapshot()})
+
 @app.route("/list_minted_badges", methods=["GET"])
+# No user_address here, so every admin would share the Streamlit host's bucket; the
+# rpc/gateway caps still bound the load, and 304 revalidations stay free
+@admission_control("rpc", "gateway", per_caller=False)
 def list_minted_badges():
-    metadata_uris = []
+    # Token metadata is immutable once minted, so the total supply versions the whole listing
     try:
-        latest_id = contract.functions.totalSupply().call()  
-        if latest_id <= 0:
-            return jsonify([]), 200
-        for token_id in range(1, latest_id + 1):
-            metadata_uri = contract.functions.tokenURI(token_id).call()
-            metadata_uris.append(metadata_uri)
+        latest_id = contract.functions.totalSupply().call()
+        return conditional_json(["badges", latest_id], None, lambda: fetch_minted_badges(latest_id))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def fetch_minted_badges(latest_id):
+    """Badge rows for token ids 1..latest_id; cacheable only if every metadata fetch succeeded"""
+    metadata_uris = []
+    for token_id in range(1, latest_id + 1):
+        metadata_uri = contract.functions.tokenURI(token_id).call()
+        metadata_uris.append(metadata_uri)
+
     results = []
     for metadata_uri in metadata_uris:
         try:
-            response = requests.get(metadata_uri)
-            if response.status_code != 200:
-                continue
-            badge_data = response.json()
+            badge_data = json.loads(gateway_pool.fetch_uri(metadata_uri, is_json_document))
             certificate_url = badge_data.get('certificate_url', 'N/A')
             attributes = badge_data.get("attributes", [])
             student_collection = {
                 list(attr.keys())[0]: list(attr.values())[0] for attr in attributes
             }
-            badge_info = OrderedDict([
-                ("Student Name", student_collection.get("Student", "N/A")),
-                ("Badge Grant Date", student_collection.get("Date", "N/A")),
-                ("Badge Type", student_collection.get("Badge Type", "N/A")),
-                ("Class or Semester", student_collection.get("Class", "N/A")),
-                ("University", student_collection.get("University", "N/A")),
-                ("Certificate URL", certificate_url),
-                ("Tokens Used", student_collection.get("Tokens Used", "N/A"))
-            ])
+            badge_info = {
+                "Student Name": student_collection.get("Student", "N/A"),
+                "Badge Grant Date": student_collection.get("Date", "N/A"),
+                "Badge Type": student_collection.get("Badge Type", "N/A"),
+                "Class or Semester": student_collection.get("Class", "N/A"),
+                "University": student_collection.get("University", "N/A"),
+                "Certificate URL": certificate_url,
+                "Tokens Used": student_collection.get("Tokens Used", "N/A")
+            }
             results.append(badge_info)
         except Exception as e:
             continue
         
-    return jsonify(results), 200
+    return results, len(results) == len(metadata_uris)
 
 if __name__ == "__main__":
     app.run(debug=True)
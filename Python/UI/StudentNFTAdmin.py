@@ -4,23 +4,50 @@ from datetime import date
 import json
 import pandas as pd
 import time
+import uuid
+import os
+from urllib.parse import urlencode
 
 # Configuration
 API_URL = "http://127.0.0.1:5000"
+# Address the admins' browsers use to reach the API (downloads stream straight from it)
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", API_URL)
 badgeTypes = ["TopQuizzer", "PitchMaster", "TopInnovator"]
 
-# Load student wallets
-studentWallets = {}
-try:
-    with open("./StudentWalletMapping.json") as f:
-        studentWallets = json.load(f)
-except FileNotFoundError:
-    st.error("StudentWalletMapping.json not found. Please create this file with student wallet mappings.")
-    studentWallets = {
-        "Alice Johnson": "0x123...",
-        "Bob Smith": "0x456...",
-        "Carol Davis": "0x789..."
-    }
+# Student roster (served by the API; the local mapping file is only a fallback)
+@st.cache_data
+def load_wallet_mapping():
+    """Fallback student wallets when the API roster is unreachable"""
+    try:
+        with open("./StudentWalletMapping.json") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        st.error("StudentWalletMapping.json not found. Please create this file with student wallet mappings.")
+        return {
+            "Alice Johnson": "0x123...",
+            "Bob Smith": "0x456...",
+            "Carol Davis": "0x789..."
+        }
+
+@st.cache_data(ttl=60)
+def search_students(prefix, limit=50):
+    """Students whose name starts with prefix, as {name: address}"""
+    try:
+        response = requests.get(f"{API_URL}/roster/search", params={"prefix": prefix, "limit": limit})
+        if response.status_code == 200:
+            return {s["student_name"]: s["user_address"] for s in response.json()["students"]}
+    except requests.exceptions.RequestException:
+        pass
+    matches = {name: address for name, address in load_wallet_mapping().items()
+               if name.casefold().startswith(prefix.casefold())}
+    return dict(list(matches.items())[:limit])
+
+def select_student(label, key):
+    """Prefix search box plus a selectbox of matching students; returns (name, address)"""
+    prefix = st.text_input("Search by name", key=f"{key}_search", placeholder="Type the start of a name")
+    matches = search_students(prefix.strip())
+    student = st.selectbox(label, [""] + list(matches.keys()), key=key)
+    return student, matches.get(student)
 
 # Initialize session state
 if 'quiz_session_id' not in st.session_state:
@@ -31,10 +58,39 @@ if 'quiz_completed' not in st.session_state:
     st.session_state.quiz_completed = False
 if 'selected_student' not in st.session_state:
     st.session_state.selected_student = None
+if 'selected_address' not in st.session_state:
+    st.session_state.selected_address = None
 if 'quiz_results' not in st.session_state:
     st.session_state.quiz_results = None
+if 'quiz_push' not in st.session_state:
+    st.session_state.quiz_push = True
+if 'quiz_channel' not in st.session_state:
+    st.session_state.quiz_channel = None
+if 'quiz_event' not in st.session_state:
+    st.session_state.quiz_event = None
+if 'last_answer' not in st.session_state:
+    st.session_state.last_answer = None
 
 # Helper Functions
+@st.cache_resource
+def etag_cache():
+    """URL -> (ETag, decoded body), shared across reruns"""
+    return {}
+
+def conditional_get(url):
+    """GET that revalidates with If-None-Match; returns (status, body) and reuses the body on 304"""
+    cache = etag_cache()
+    cached = cache.get(url)
+    response = requests.get(url, headers={"If-None-Match": cached[0]} if cached else {})
+    if response.status_code == 304 and cached:
+        return 200, cached[1]
+    body = response.json()
+    if response.status_code == 200 and response.headers.get("ETag"):
+        if len(cache) > 1000:
+            cache.clear()
+        cache[url] = (response.headers["ETag"], body)
+    return response.status_code, body
+
 def initialize_user(user_address):
     """Initialize user with starting tokens"""
     try:
@@ -47,8 +103,8 @@ def initialize_user(user_address):
 def get_user_balance(user_address):
     """Get user token balance"""
     try:
-        response = requests.get(f"{API_URL}/get_user_balance/{user_address}")
-        return response.json() if response.status_code == 200 else None
+        status, body = conditional_get(f"{API_URL}/get_user_balance/{user_address}")
+        return body if status == 200 else None
     except requests.exceptions.RequestException:
         return None
 
@@ -64,8 +120,8 @@ def start_quiz(user_address):
 def get_question(session_id):
     """Get current question"""
     try:
-        response = requests.get(f"{API_URL}/get_question/{session_id}")
-        return response.json() if response.status_code == 200 else None
+        status, body = conditional_get(f"{API_URL}/get_question/{session_id}")
+        return body if status == 200 else None
     except requests.exceptions.RequestException:
         return None
 
@@ -78,14 +134,64 @@ def submit_answer(session_id, answer):
     except requests.exceptions.RequestException:
         return None
 
+def open_quiz_channel(session_id):
+    """Open the server-push stream for a quiz session"""
+    try:
+        response = requests.get(f"{API_URL}/quiz_channel/{session_id}", stream=True, timeout=(5, 60))
+        if response.status_code != 200:
+            return None
+        return {"response": response, "lines": response.iter_lines(decode_unicode=True)}
+    except requests.exceptions.RequestException:
+        return None
+
+def next_quiz_event(channel):
+    """Block until the next quiz event (result, balance and next question) arrives"""
+    data = []
+    try:
+        for line in channel["lines"]:
+            if line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line and data:
+                return json.loads("\n".join(data))
+    except requests.exceptions.RequestException:
+        pass
+    return None
+
+def close_quiz_channel():
+    if st.session_state.quiz_channel:
+        st.session_state.quiz_channel["response"].close()
+    st.session_state.quiz_channel = None
+    st.session_state.quiz_event = None
+
 def check_nft_eligibility(user_address):
     """Check if user can mint NFT"""
     try:
-        response = requests.get(f"{API_URL}/check_nft_eligibility/{user_address}")
-        return response.json() if response.status_code == 200 else None
+        status, body = conditional_get(f"{API_URL}/check_nft_eligibility/{user_address}")
+        return body if status == 200 else None
     except requests.exceptions.RequestException:
         return None
 
+def wait_for_mint(tx_hash, attempts=10):
+    """Poll the API until a submitted mint is confirmed or reverted"""
+    for _ in range(attempts):
+        try:
+            response = requests.get(f"{API_URL}/mint_status/{tx_hash}")
+            if response.status_code == 200 and response.json().get("status") != "pending":
+                return response.json()
+        except requests.exceptions.RequestException:
+            return None
+        time.sleep(1)
+    return None
+
+def submission_key(payload):
+    """Idempotency key that stays the same while this exact form is resubmitted (retries, double clicks)"""
+    fingerprint = json.dumps(payload, sort_keys=True)
+    pending = st.session_state.get("pending_submission")
+    if not pending or pending[0] != fingerprint:
+        pending = (fingerprint, str(uuid.uuid4()))
+        st.session_state.pending_submission = pending
+    return pending[1]
+
 def format_data_for_display(raw_data):
     """Format badge data for display"""
     formatted_data = []
@@ -165,11 +271,11 @@ elif page == "🧠 Take Quiz":
     # Student selection
     if not st.session_state.selected_student:
         st.subheader("Select Your Profile")
-        student = st.selectbox("Choose your name:", [""] + list(studentWallets.keys()))
+        student, user_address = select_student("Choose your name:", "quiz_student")
         
         if student and st.button("Start Learning Journey"):
             st.session_state.selected_student = student
-            user_address = studentWallets[student]
+            st.session_state.selected_address = user_address
             
             # Initialize user
             init_result = initialize_user(user_address)
@@ -181,16 +287,24 @@ elif page == "🧠 Take Quiz":
     
     else:
         student = st.session_state.selected_student
-        user_address = studentWallets[student]
+        user_address = st.session_state.selected_address
         
-        # Show current balance
-        balance_data = get_user_balance(user_address)
+        st.toggle("⚡ Live quiz updates (server push)", key="quiz_push",
+                  disabled=st.session_state.quiz_session_id is not None)
+        
+        # Show current balance (pushed with every quiz event in live mode)
+        quiz_event = st.session_state.quiz_event
+        if quiz_event:
+            balance_data = {"tokens": quiz_event["total_tokens"]}
+            eligibility = {"eligible": quiz_event["eligible"], "tokens_needed": quiz_event["tokens_needed"]}
+        else:
+            balance_data = get_user_balance(user_address)
+            eligibility = check_nft_eligibility(user_address) if balance_data else None
         if balance_data:
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("Current Tokens", balance_data.get('tokens', 0))
             with col2:
-                eligibility = check_nft_eligibility(user_address)
                 if eligibility:
                     st.metric("NFT Status", "✅ Eligible" if eligibility.get('eligible') else "❌ Not Eligible")
             with col3:
@@ -208,13 +322,32 @@ elif page == "🧠 Take Quiz":
                     st.session_state.quiz_session_id = quiz_data['session_id']
                     st.session_state.current_question = 0
                     st.session_state.quiz_completed = False
+                    if st.session_state.quiz_push:
+                        channel = open_quiz_channel(quiz_data['session_id'])
+                        first_event = next_quiz_event(channel) if channel else None
+                        if first_event:
+                            st.session_state.quiz_channel = channel
+                            st.session_state.quiz_event = first_event
+                        elif channel:
+                            channel["response"].close()
                     st.rerun()
                 else:
                     st.error("Failed to start quiz. Please try again.")
         
         elif st.session_state.quiz_session_id and not st.session_state.quiz_completed:
+            # Result of the previous answer, shown above the next question instead of sleeping
+            last_answer = st.session_state.last_answer
+            if last_answer:
+                if last_answer['correct']:
+                    st.success(f"🎉 Correct! You earned {last_answer['tokens_earned']} tokens!")
+                else:
+                    st.error(f"❌ Incorrect. The correct answer was: {last_answer['correct_option']}")
+            
             # Display current question
-            question_data = get_question(st.session_state.quiz_session_id)
+            if st.session_state.quiz_channel:
+                question_data = (st.session_state.quiz_event or {}).get('question')
+            else:
+                question_data = get_question(st.session_state.quiz_session_id)
             
             if question_data and 'error' not in question_data:
                 st.subheader(f"Question {question_data['question_number']} of {question_data['total_questions']}")
@@ -229,26 +362,29 @@ elif page == "🧠 Take Quiz":
                     answer_index = question_data['options'].index(answer)
                     result = submit_answer(st.session_state.quiz_session_id, answer_index)
                     
-                    if result:
-                        # Show result
-                        if result['correct']:
-                            st.success(f"🎉 Correct! You earned {result['tokens_earned']} tokens!")
+                    if result and st.session_state.quiz_channel:
+                        # The channel pushes the graded result, balance and next question as one event
+                        event = next_quiz_event(st.session_state.quiz_channel)
+                        if event:
+                            st.session_state.quiz_event = event
+                            result = dict(result, **event)
                         else:
-                            correct_answer = question_data['options'][result['correct_answer']]
-                            st.error(f"❌ Incorrect. The correct answer was: {correct_answer}")
-                        
-                        st.info(f"💰 Total tokens: {result['total_tokens']}")
-                        
+                            # Stream ended (time cap or dropped): carry on in pull mode
+                            close_quiz_channel()
+                    
+                    if result:
+                        st.session_state.last_answer = {
+                            "correct": result['correct'],
+                            "tokens_earned": result['tokens_earned'],
+                            "correct_option": question_data['options'][result['correct_answer']]
+                        }
                         if result['quiz_completed']:
                             st.session_state.quiz_completed = True
-                            st.session_state.quiz_results = result
-                            st.balloons()
-                            time.sleep(2)
-                            st.rerun()
+                            st.session_state.quiz_results = dict(result, celebrate=True)
+                            close_quiz_channel()
                         else:
                             st.session_state.current_question += 1
-                            time.sleep(2)
-                            st.rerun()
+                        st.rerun()
             else:
                 st.error("Error loading question. Please restart the quiz.")
         
@@ -256,6 +392,14 @@ elif page == "🧠 Take Quiz":
             # Show quiz results
             st.subheader("🎊 Quiz Completed!")
             results = st.session_state.quiz_results
+            if results.pop('celebrate', False):
+                st.balloons()
+            last_answer = st.session_state.last_answer
+            if last_answer:
+                if last_answer['correct']:
+                    st.success(f"🎉 Correct! You earned {last_answer['tokens_earned']} tokens!")
+                else:
+                    st.error(f"❌ Incorrect. The correct answer was: {last_answer['correct_option']}")
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -268,6 +412,7 @@ elif page == "🧠 Take Quiz":
             if results.get('can_mint_nft'):
                 st.success("🏆 Congratulations! You have enough tokens to mint an NFT badge!")
                 if st.button("Go to Mint Badge", type="primary"):
+                    st.session_state.last_answer = None
                     st.session_state.quiz_session_id = None
                     st.session_state.quiz_completed = False
                     st.session_state.quiz_results = None
@@ -280,11 +425,15 @@ elif page == "🧠 Take Quiz":
                 st.session_state.quiz_session_id = None
                 st.session_state.quiz_completed = False
                 st.session_state.quiz_results = None
+                st.session_state.last_answer = None
                 st.rerun()
         
         # Reset button
         if st.button("🔄 Reset Session"):
+            close_quiz_channel()
+            st.session_state.last_answer = None
             st.session_state.selected_student = None
+            st.session_state.selected_address = None
             st.session_state.quiz_session_id = None
             st.session_state.quiz_completed = False
             st.session_state.quiz_results = None
@@ -294,10 +443,9 @@ elif page == "💰 Token Balance":
     # --- Token Balance Page ---
     st.header("💰 Token Management")
     
-    student = st.selectbox("Select Student:", [""] + list(studentWallets.keys()))
+    student, user_address = select_student("Select Student:", "balance_student")
     
     if student:
-        user_address = studentWallets[student]
         
         # Get balance
         balance_data = get_user_balance(user_address)
@@ -340,10 +488,9 @@ elif page == "🪙 Mint Badge NFT":
     st.header("🪙 Mint Badge NFT")
     
     badge_type = st.selectbox("Select Badge Type", badgeTypes)
-    student = st.selectbox("Select Student", [""] + list(studentWallets.keys()))
+    student, user_address = select_student("Select Student", "mint_student")
     
     if student:
-        user_address = studentWallets[student]
         
         # Check eligibility
         eligibility = check_nft_eligibility(user_address)
@@ -381,7 +528,9 @@ elif page == "🪙 Mint Badge NFT":
                             "user_address": user_address
                         }
                         
-                        response = requests.post(f"{API_URL}/uploadMetadata", json=payload)
+                        idempotency_key = submission_key(payload)
+                        response = requests.post(f"{API_URL}/uploadMetadata", json=payload,
+                                                 headers={"Idempotency-Key": idempotency_key})
                         
                         if response.status_code == 200:
                             metaDataURI = response.json().get("metadata_uri")
@@ -395,15 +544,26 @@ elif page == "🪙 Mint Badge NFT":
                                 "user_address": user_address
                             }
                             
-                            mintStatus = requests.post(f"{API_URL}/mintBadge", json=badgeData)
+                            mintStatus = requests.post(f"{API_URL}/mintBadge", json=badgeData,
+                                                       headers={"Idempotency-Key": idempotency_key})
                             
                             if mintStatus.status_code == 200:
+                                # Done: the next submission of this form is a new badge
+                                st.session_state.pending_submission = None
                                 mint_result = mintStatus.json()
-                                st.success(f"🎉 Badge minted successfully!")
-                                st.info(f"Transaction Hash: {mint_result.get('tx_hash')}")
-                                st.info(f"Tokens Used: {mint_result.get('tokens_deducted', 300)}")
-                                st.info(f"Remaining Tokens: {mint_result.get('remaining_tokens', 0)}")
-                                st.balloons()
+                                outcome = wait_for_mint(mint_result.get('tx_hash'))
+                                if outcome and outcome.get('status') == 'reverted':
+                                    st.error(f"❌ Minting reverted: {outcome.get('error', 'Unknown error')}")
+                                    st.info(f"Tokens Refunded: {outcome.get('tokens_refunded', 0)}")
+                                else:
+                                    if outcome and outcome.get('status') == 'minted':
+                                        st.success(f"🎉 Badge minted successfully! Token ID: {outcome.get('token_id')}")
+                                        st.balloons()
+                                    else:
+                                        st.warning("⏳ Mint transaction submitted and still pending confirmation.")
+                                    st.info(f"Transaction Hash: {mint_result.get('tx_hash')}")
+                                    st.info(f"Tokens Used: {mint_result.get('tokens_deducted', 300)}")
+                                    st.info(f"Remaining Tokens: {mint_result.get('remaining_tokens', 0)}")
                             else:
                                 error_msg = mintStatus.json().get('error', 'Unknown error')
                                 st.error(f"❌ Minting failed: {error_msg}")
@@ -420,10 +580,9 @@ elif page == "🎖️ View Granted Badges":
     st.header("🎖️ View Granted Badges")
     
     try:
-        response = requests.get(f"{API_URL}/list_minted_badges")
+        status, data = conditional_get(f"{API_URL}/list_minted_badges")
         
-        if response.status_code == 200:
-            data = response.json()
+        if status == 200:
             
             if not data or data == 0:
                 st.info("🚀 No badges granted yet. Start taking quizzes to earn your first badge!")
@@ -467,18 +626,29 @@ elif page == "🎖️ View Granted Badges":
                     st.subheader(f"📋 Badge Records ({len(filtered_df)} records)")
                     st.dataframe(filtered_df, use_container_width=True)
                     
-                    # Download option
-                    csv = filtered_df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download as CSV",
-                        data=csv,
-                        file_name="student_badges.csv",
-                        mime="text/csv"
-                    )
+                    # Download option (streamed by the API straight to the browser)
+                    st.subheader("📥 Badge Log Export")
+                    st.caption("Exports the API's badge log: every metadata upload with its mint status, "
+                               "including uploads that were never minted or reverted. It can differ from the "
+                               "on-chain records above.")
+                    export_params = {}
+                    if badge_filter != "All":
+                        export_params["badge_type"] = badge_filter
+                    if student_filter != "All":
+                        export_params["student_name"] = student_filter
+                    col1, col2, col3 = st.columns(3)
+                    for col, (label, export_format) in zip([col1, col2, col3], [
+                        ("📥 Badge log as CSV", "csv"),
+                        ("📥 Badge log as Parquet", "parquet"),
+                        ("📥 Badge log as JSON Lines", "jsonl")
+                    ]):
+                        with col:
+                            query = urlencode(dict(export_params, format=export_format))
+                            st.link_button(label, f"{PUBLIC_API_URL}/badges/export?{query}")
                 else:
                     st.dataframe(df, use_container_width=True)
         else:
-            st.error(f"❌ Failed to fetch badge data: {response.status_code}")
+            st.error(f"❌ Failed to fetch badge data: {status}")
             
     except requests.exceptions.RequestException as e:
         st.error(f"❌ Connection error: {str(e)}")
@@ -0,0 +1,87 @@
+"""Benchmark JSON encoding and compression for a list_minted_badges-sized payload.
+
+Compares the old path (stdlib json with sorted keys over OrderedDict rows, as
+Flask's default jsonify did) with the API's own response path: jsonify through
+FastJSONProvider.response, encode_json and compress_body, for each JSON_ENCODER.
+Reads the same .env as the API for the contract ABI; the chain is never called,
+so the connection check is skipped.
+
+    python bench_response_encoding.py [num_badges]
+"""
+import json
+import sys
+import time
+from collections import OrderedDict
+from unittest import mock
+
+from web3 import Web3
+
+with mock.patch.object(Web3, "is_connected", return_value=True):
+    import StudentNFTAPI as api
+
+BADGE_TYPES = ["TopQuizzer", "PitchMaster", "TopInnovator"]
+REPEATS = 20
+
+
+def make_badges(count, ordered, token_id_base=0):
+    row_type = OrderedDict if ordered else dict
+    return [
+        row_type([
+            ("Student Name", f"Student {i:05d}"),
+            ("Badge Grant Date", f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}"),
+            ("Badge Type", BADGE_TYPES[i % 3]),
+            ("Class or Semester", f"Semester {i % 8 + 1}"),
+            ("University", "PES University"),
+            ("Certificate URL", f"https://tinyurl.com/{i:08x}"),
+            ("Tokens Used", 300),
+            ("token_id", token_id_base + i)
+        ])
+        for i in range(count)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"{count} badges, mean of {REPEATS} runs\n")
+
+    rows = make_badges(count, False)
+    # uint256 token ids do not fit orjson's 64-bit integers and take the stdlib fallback
+    wide_rows = make_badges(count, False, token_id_base=2 ** 255)
+    ordered_rows = make_badges(count, True)
+    encoders = [("json.dumps (old jsonify, OrderedDict, sorted)", None,
+                 lambda: json.dumps(ordered_rows, sort_keys=True, indent=None).encode())]
+    for encoder in ("json", "orjson") if api.orjson is not None else ("json",):
+        encoders.append((f"jsonify [{encoder}]", encoder, lambda: api.app.json.response(rows).get_data()))
+        encoders.append((f"encode_json [{encoder}]", encoder, lambda: api.encode_json(rows)))
+        encoders.append((f"encode_json [{encoder}, uint256 ids]", encoder, lambda: api.encode_json(wide_rows)))
+
+    print(f"{'encoder':<45} {'ms':>8} {'bytes':>10}")
+    body = None
+    for name, encoder, encode in encoders:
+        api.JSON_ENCODER = encoder or api.JSON_ENCODER
+        with api.app.app_context():
+            encoded, ms = timed(encode)
+        if name.startswith("encode_json") and "uint256" not in name:
+            body = encoded
+        print(f"{name:<45} {ms:>8.2f} {len(encoded):>10}")
+
+    codecs = [(f"gzip level {api.GZIP_LEVEL}", "gzip")]
+    if api.brotli is not None:
+        codecs.append((f"brotli quality {api.BROTLI_QUALITY}", "br"))
+
+    print(f"\n{'content-encoding (compress_body)':<45} {'ms':>8} {'on wire':>10}")
+    print(f"{'identity':<45} {0:>8.2f} {len(body):>10}")
+    for name, encoding in codecs:
+        wire, ms = timed(lambda: api.compress_body(body, encoding))
+        print(f"{name:<45} {ms:>8.2f} {len(wire):>10}")
+
+
+if __name__ == "__main__":
+    main()
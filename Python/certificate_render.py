@@ -0,0 +1,54 @@
+"""Certificate drawing, run in the render worker processes.
+
+Kept apart from StudentNFTAPI and importing only Pillow, so a render worker
+never has to load the API module's Flask, chain and state backend setup.
+"""
+import os
+import tempfile
+
+from PIL import Image, ImageDraw, ImageFont
+
+CERTIFICATE_FONT = os.getenv("CERTIFICATE_FONT")
+# Blank band painted over the template placeholder text, as fractions of (left, top, right, bottom)
+CERTIFICATE_TEXT_BAND = (0.24, 0.34, 0.99, 0.70)
+# Text lines drawn centred in the band: (field, vertical position, font size), fractions of image height
+CERTIFICATE_TEXT_LAYOUT = [
+    ("student_name", 0.42, 0.075),
+    ("class_university", 0.52, 0.040),
+    ("grant_date", 0.61, 0.035)
+]
+
+def _certificate_font(size):
+    if CERTIFICATE_FONT:
+        return ImageFont.truetype(CERTIFICATE_FONT, size)
+    return ImageFont.load_default(size)
+
+def render_certificate(template_path, fields, output_path):
+    """Draw the student details onto a badge template"""
+    with Image.open(template_path) as template:
+        image = template.convert("RGB")
+    width, height = image.size
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = CERTIFICATE_TEXT_BAND
+    draw.rectangle((left * width, top * height, right * width, bottom * height), fill="white")
+
+    lines = {
+        "student_name": fields["student_name"],
+        "class_university": f"{fields['class_semester']}  |  {fields['university']}",
+        "grant_date": fields["grant_date"]
+    }
+    centre_x = (left + right) / 2 * width
+    for field, y, size in CERTIFICATE_TEXT_LAYOUT:
+        draw.text((centre_x, y * height), lines[field], fill=(46, 56, 110),
+                  font=_certificate_font(int(size * height)), anchor="mm")
+
+    # Unique temp name: identical renders from other processes may finish at the same time
+    fd, tmp_path = tempfile.mkstemp(suffix=".png.tmp", dir=os.path.dirname(output_path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, format="PNG")
+        os.replace(tmp_path, output_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return output_path
@@ -0,0 +1,211 @@
+import collections
+import json
+import os
+import sys
+import tempfile
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+from web3 import Web3
+
+# StudentNFTAPI connects to the chain and loads the contract ABI at import time;
+# point it at a throwaway working directory and a stub ABI so the tests need no node.
+WORK_DIR = tempfile.mkdtemp(prefix="studentnft-tests-")
+os.makedirs(os.path.join(WORK_DIR, "StudentBadges"))
+CONTRACT_JSON = os.path.join(WORK_DIR, "StudentBadgeNFT.json")
+with open(CONTRACT_JSON, "w") as f:
+    json.dump({"abi": [{
+        "type": "event",
+        "name": "BadgeMinted",
+        "anonymous": False,
+        "inputs": [
+            {"name": "recipient", "type": "address", "indexed": True},
+            {"name": "tokenId", "type": "uint256", "indexed": True},
+            {"name": "badgeType", "type": "string", "indexed": False},
+            {"name": "metadataURI", "type": "string", "indexed": False}
+        ]
+    }]}, f)
+
+os.environ["CONTRACT_JSON"] = CONTRACT_JSON
+os.environ["SMART_CONTRACT_ADDRESS"] = "0x" + "00" * 19 + "01"
+os.environ["STATE_BACKEND"] = "memory"
+os.environ["WALLET_MAPPING_FILE"] = os.path.join(WORK_DIR, "StudentWalletMapping.json")
+os.chdir(WORK_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+with mock.patch.object(Web3, "is_connected", return_value=True):
+    import StudentNFTAPI
+
+
+@pytest.fixture
+def api():
+    return StudentNFTAPI
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return StudentNFTAPI.InMemoryStateBackend()
+    return StudentNFTAPI.SQLiteStateBackend(str(tmp_path / "state.db"))
+
+
+@pytest.fixture
+def memory_state(monkeypatch):
+    backend = StudentNFTAPI.InMemoryStateBackend()
+    monkeypatch.setattr(StudentNFTAPI, "state", backend)
+    return backend
+
+
+@pytest.fixture
+def client(memory_state, monkeypatch):
+    # Tests share one remote address, so give them a bucket they cannot exhaust
+    monkeypatch.setattr(StudentNFTAPI, "user_rate_limiter", StudentNFTAPI.TokenBucketLimiter(1000, 1000, 1000))
+    monkeypatch.setattr(StudentNFTAPI, "response_cache", StudentNFTAPI.ResponseBodyCache(100))
+    return StudentNFTAPI.app.test_client()
+
+
+@pytest.fixture
+def badge_log(monkeypatch, tmp_path):
+    """Point the badge log at a fresh file; returns its path"""
+    path = tmp_path / "StudentBadgeData.json"
+    monkeypatch.setattr(StudentNFTAPI, "STUDENT_BADGE_DATA", str(path))
+    monkeypatch.setattr(StudentNFTAPI, "BADGE_LOG_LOCK", str(path) + ".lock")
+    monkeypatch.setattr(StudentNFTAPI, "BADGE_UPLOAD_JOURNAL", str(tmp_path / "StudentBadgeUploads.jsonl"))
+    return path
+
+
+class FakeEth:
+    def __init__(self, chain):
+        self.chain = chain
+        self.gas_price = 2 * 10 ** 9
+        self.max_priority_fee = 10 ** 9
+
+    @property
+    def block_number(self):
+        return len(self.chain.blocks) - 1
+
+    def get_block(self, block_identifier):
+        number = self.block_number if block_identifier == "latest" else block_identifier
+        self.chain.calls["get_block"] += 1
+        block = {"number": number, "transactions": list(self.chain.blocks[number])}
+        if self.chain.base_fee is not None:
+            block["baseFeePerGas"] = self.chain.base_fee
+        return block
+
+    def get_transaction_receipt(self, tx_hash):
+        self.chain.calls["get_transaction_receipt"] += 1
+        if tx_hash not in self.chain.receipts:
+            raise ValueError(f"Transaction {tx_hash} not found")
+        return self.chain.receipts[tx_hash]
+
+
+class FakeBadgeMinted:
+    def __init__(self, chain):
+        self.chain = chain
+
+    def __call__(self):
+        return self
+
+    def process_receipt(self, receipt, errors=None):
+        return [event for event in self.chain.events if event["transactionHash"] == receipt["transactionHash"]]
+
+    def get_logs(self, from_block, to_block):
+        self.chain.calls["get_logs"] += 1
+        return [event for event in self.chain.events if from_block <= event["blockNumber"] <= to_block]
+
+
+class FakeMintCall:
+    def __init__(self, chain, args):
+        self.chain = chain
+        self.args = args
+
+    def estimate_gas(self, transaction):
+        self.chain.calls["estimate_gas"] += 1
+        return 100000 + 10 * len(self.args[2])
+
+    def call(self, transaction, block_identifier=None):
+        raise ValueError("execution reverted: Badge limit reached")
+
+
+class FakeChain:
+    """Just enough of web3 and the badge contract for the code paths that talk to the chain"""
+
+    def __init__(self, blocks=1):
+        self.blocks = [[] for _ in range(blocks)]
+        self.receipts = {}
+        self.events = []
+        self.base_fee = None
+        self.calls = collections.Counter()
+        self.eth = FakeEth(self)
+        self.events_namespace = types.SimpleNamespace(BadgeMinted=FakeBadgeMinted(self))
+        self.functions = types.SimpleNamespace(mintBadge=lambda *args: FakeMintCall(self, args))
+
+    @staticmethod
+    def to_hex(value):
+        return value
+
+    def mine(self, *tx_hashes):
+        self.blocks.append(list(tx_hashes))
+        return self.eth.block_number
+
+    def mint(self, tx_hash, token_id, metadata_uri, recipient="0x" + "a1" * 20, badge_type="TopQuizzer"):
+        """Mine a successful mint with its BadgeMinted event"""
+        block_number = self.mine(tx_hash)
+        self.receipts[tx_hash] = {"transactionHash": tx_hash, "blockNumber": block_number, "status": 1, "gasUsed": 90000}
+        self.events.append({"transactionHash": tx_hash, "blockNumber": block_number, "args": {
+            "tokenId": token_id, "recipient": recipient, "badgeType": badge_type, "metadataURI": metadata_uri}})
+        return block_number
+
+    def revert(self, tx_hash):
+        block_number = self.mine(tx_hash)
+        self.receipts[tx_hash] = {"transactionHash": tx_hash, "blockNumber": block_number, "status": 0, "gasUsed": 30000}
+        return block_number
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    fake = FakeChain()
+    monkeypatch.setattr(StudentNFTAPI, "web3", fake)
+    monkeypatch.setattr(StudentNFTAPI, "contract",
+                        types.SimpleNamespace(events=fake.events_namespace, functions=fake.functions))
+    return fake
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local HTTP server answering with respond(method, path, headers, body) -> (status, content_type, body)"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.url = f"http://127.0.0.1:{self.server_port}"
+        self.requests = []
+        self.respond = lambda method, path, headers, body: (404, "text/plain", b"not found")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _handle(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append((self.command, self.path, self.headers, body))
+        status, content_type, payload = self.server.respond(self.command, self.path, self.headers, body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_stub():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
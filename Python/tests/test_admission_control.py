@@ -0,0 +1,96 @@
+import pytest
+from flask import jsonify
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+
+
+def test_token_bucket_limiter(api, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(api.time, "monotonic", lambda: now[0])
+    limiter = api.TokenBucketLimiter(burst=3, rate=0.5, max_keys=100)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == 2
+    assert limiter.acquire("b") == 0
+    now[0] += 2
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == 2
+
+
+def test_token_bucket_limiter_evicts(api, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(api.time, "monotonic", lambda: now[0])
+    limiter = api.TokenBucketLimiter(burst=2, rate=1, max_keys=2)
+
+    limiter.acquire("a")
+    limiter.acquire("b")
+    now[0] += 5
+    limiter.acquire("c")
+    assert list(limiter.buckets) == ["c"]
+
+    limiter.acquire("d")
+    limiter.acquire("e")
+    assert len(limiter.buckets) == 2
+
+
+def test_dependency_limiter_is_all_or_nothing(api):
+    limiter = api.DependencyLimiter({"rpc": 1, "gateway": 2})
+
+    assert limiter.try_acquire(["gateway", "rpc"]) is None
+    assert limiter.try_acquire(["gateway", "rpc"]) == "rpc"
+    # The gateway slot taken by the failed attempt was given back
+    assert limiter.try_acquire(["gateway"]) is None
+    assert limiter.try_acquire(["gateway"]) == "gateway"
+    limiter.release(["gateway", "rpc"])
+    assert limiter.try_acquire(["rpc"]) is None
+
+
+@pytest.fixture
+def limits(api, monkeypatch):
+    monkeypatch.setattr(api, "user_rate_limiter", api.TokenBucketLimiter(2, 0.5, 100))
+    monkeypatch.setattr(api, "dependency_limiter", api.DependencyLimiter({"rpc": 1}))
+
+
+def call(api, view, user_address=ALICE):
+    with api.app.test_request_context("/mintBadge", method="POST", json={"user_address": user_address}):
+        return api.app.make_response(view())
+
+
+def test_caller_over_its_rate_gets_429(api, limits):
+    view = api.admission_control("rpc")(lambda: jsonify({"ok": True}))
+
+    assert [call(api, view).status_code for _ in range(3)] == [200, 200, 429]
+    response = call(api, view)
+    assert response.headers["Retry-After"] == "2"
+    assert response.get_json()["retry_after"] == 2
+    assert call(api, view, BOB).status_code == 200
+
+
+def test_saturated_dependency_gets_429(api, limits):
+    inner = api.admission_control("rpc")(lambda: jsonify({"ok": True}))
+    outer = api.admission_control("rpc")(lambda: call(api, inner, BOB))
+
+    response = call(api, outer)
+    assert response.status_code == 429
+    assert "rpc" in response.get_json()["error"]
+    assert response.headers["Retry-After"] == str(api.DEPENDENCY_RETRY_AFTER)
+
+
+def test_dependency_slot_released_after_errors(api, limits):
+    def failing():
+        raise RuntimeError("node down")
+
+    view = api.admission_control("rpc")(failing)
+    with pytest.raises(RuntimeError):
+        call(api, view)
+    assert api.dependency_limiter.try_acquire(["rpc"]) is None
+
+
+def test_per_caller_false_skips_the_bucket(api, limits):
+    view = api.admission_control("rpc", per_caller=False)(lambda: jsonify({"ok": True}))
+    assert [call(api, view).status_code for _ in range(5)] == [200] * 5
+
+    inner = api.admission_control("rpc", per_caller=False)(lambda: jsonify({"ok": True}))
+    outer = api.admission_control("rpc", per_caller=False)(lambda: call(api, inner))
+    assert call(api, outer).status_code == 429
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+RECORDS = [
+    {"student_name": "Alice", "badge_type": "TopQuizzer", "grant_date": "2026-09-01", "tokens_used": 300,
+     "mint_status": "minted", "token_id": 1, "metadata_uri": "ipfs://a"},
+    {"student_name": "Bob [TA]", "badge_type": "PitchMaster", "grant_date": "2026-10-01", "tokens_used": 300,
+     "notes": "braces } and , commas"},
+    {"student_name": "Chloé", "badge_type": "TopQuizzer", "grant_date": "2026-10-15", "tokens_used": 300,
+     "mint_status": "minted", "token_id": 2, "nested": {"list": [1, 2, {"x": "]"}]}}
+]
+
+
+@pytest.fixture
+def records(badge_log):
+    badge_log.write_text(json.dumps(RECORDS, indent=2, ensure_ascii=False), encoding="utf-8")
+    return RECORDS
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64, 64 * 1024])
+def test_iter_badge_log_across_chunks(api, monkeypatch, records, read_size):
+    monkeypatch.setattr(api, "BADGE_LOG_READ_SIZE", read_size)
+    assert list(api.iter_badge_log()) == records
+
+
+def test_iter_badge_log_empty_and_missing(api, badge_log):
+    assert list(api.iter_badge_log()) == []
+    badge_log.write_text("[]")
+    assert list(api.iter_badge_log()) == []
+
+
+def test_iter_badge_log_truncated(api, monkeypatch, badge_log):
+    badge_log.write_text('[{"student_name": "Alice"}, {"student_name": "Bo')
+    monkeypatch.setattr(api, "BADGE_LOG_READ_SIZE", 8)
+
+    log = api.iter_badge_log()
+    assert next(log) == {"student_name": "Alice"}
+    with pytest.raises(json.JSONDecodeError):
+        next(log)
+
+
+def test_csv_export(client, records):
+    response = client.get("/badges/export?format=csv")
+
+    assert response.mimetype == "text/csv"
+    assert "attachment; filename=student_badges.csv" == response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row["student_name"] for row in rows] == ["Alice", "Bob [TA]", "Chloé"]
+    assert rows[1]["mint_status"] == "" and rows[2]["token_id"] == "2"
+
+
+def test_jsonl_export_filters(client, records):
+    response = client.get("/badges/export?format=jsonl&badge_type=TopQuizzer&from=2026-10-01")
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["student_name"] for line in lines] == ["Chloé"]
+    assert lines[0]["tokens_used"] == 300 and "nested" not in lines[0]
+
+    response = client.get("/badges/export?format=jsonl&mint_status=minted&to=2026-09-30")
+    assert [json.loads(line)["student_name"] for line in response.get_data(as_text=True).splitlines()] == ["Alice"]
+
+
+def test_parquet_export_writes_a_row_group_per_chunk(api, client, records, monkeypatch):
+    monkeypatch.setattr(api, "EXPORT_CHUNK_ROWS", 2)
+    response = client.get("/badges/export?format=parquet")
+
+    parquet = pq.ParquetFile(io.BytesIO(response.get_data()))
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("student_name").to_pylist() == ["Alice", "Bob [TA]", "Chloé"]
+    assert table.column("token_id").to_pylist() == [1, None, 2]
+
+
+def test_export_chunks(api, records, monkeypatch):
+    monkeypatch.setattr(api, "EXPORT_CHUNK_ROWS", 2)
+    chunks = list(api.iter_badge_export_chunks({"badge_type": None}))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+
+
+def test_export_format_errors(api, client, records, monkeypatch):
+    assert client.get("/badges/export?format=xlsx").status_code == 400
+    monkeypatch.setattr(api, "pa", None)
+    assert client.get("/badges/export?format=parquet").status_code == 400
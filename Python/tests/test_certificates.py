@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+from concurrent.futures import Future
+
+import pytest
+from PIL import Image
+
+FIELDS = {"student_name": "Alice", "class_semester": "CSE 5", "university": "PES", "grant_date": "2026-10-19"}
+
+
+@pytest.fixture
+def renderer(api, tmp_path, monkeypatch):
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    Image.new("RGB", (400, 300), "navy").save(templates / "TopQuizzer.png")
+    renderer = api.CertificateRenderer(str(templates), str(tmp_path / "rendered"), 1)
+    monkeypatch.setattr(api, "certificate_renderer", renderer)
+    yield renderer
+    if renderer.pool is not None:
+        renderer.pool.shutdown()
+
+
+def test_render_draws_on_the_template(renderer):
+    path = renderer.render("TopQuizzer", FIELDS)
+
+    with Image.open(path) as image:
+        assert image.size == (400, 300)
+        # The text band is painted over the template's placeholder
+        assert image.getpixel((int(0.3 * 400), int(0.66 * 300))) == (255, 255, 255)
+        assert image.getpixel((10, 10)) == (0, 0, 128)
+
+
+def test_rendered_certificates_are_cached(renderer):
+    path = renderer.render("TopQuizzer", FIELDS)
+    certificate_hash, future, cached = renderer.submit("TopQuizzer", dict(FIELDS))
+
+    assert cached and future is None
+    assert renderer.output_path(certificate_hash) == path
+    assert renderer.submit("TopQuizzer", dict(FIELDS, student_name="Bob"))[0] != certificate_hash
+
+
+def test_template_change_invalidates_cache(renderer):
+    certificate_hash = renderer.certificate_hash("TopQuizzer", FIELDS)
+    template = renderer.template_path("TopQuizzer")
+    Image.new("RGB", (400, 300), "teal").save(template)
+    os.utime(template, (0, 0))
+
+    assert renderer.certificate_hash("TopQuizzer", FIELDS) != certificate_hash
+
+
+def test_render_batch_endpoint(renderer, client):
+    students = [{"student_name": name, "class_semester": "CSE 5", "university": "PES"} for name in ("Alice", "Bob")]
+    response = client.post("/certificates/render_batch",
+                           json={"badge_type": "TopQuizzer", "students": students, "grant_date": "2026-10-19"})
+
+    results = response.get_json()["certificates"]
+    assert [r["student_name"] for r in results] == ["Alice", "Bob"]
+    assert not any(r["cached"] or "error" in r for r in results)
+    image = client.get(f"/certificates/{results[0]['certificate_hash']}")
+    assert image.status_code == 200 and image.mimetype == "image/png"
+    image.close()
+
+
+def test_certificate_errors(renderer, client):
+    response = client.post("/certificates/render_batch", json={"badge_type": "PitchMaster", "students": [
+        {"student_name": "Alice", "class_semester": "CSE 5", "university": "PES"}]})
+    assert response.status_code == 400
+    assert client.post("/certificates/render_batch", json={"badge_type": "TopQuizzer", "students": [{}]}).status_code == 400
+    assert client.get("/certificates/not-a-hash").status_code == 400
+    assert client.get("/certificates/" + "0" * 64).status_code == 404
+
+
+class CountingPool:
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        return Future()
+
+
+def test_identical_concurrent_renders_share_one_job(renderer):
+    renderer.pool = pool = CountingPool()
+    barrier = threading.Barrier(8)
+    futures = []
+
+    def submit():
+        barrier.wait()
+        futures.append(renderer.submit("TopQuizzer", dict(FIELDS))[1])
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.submitted == 1
+    assert all(future is futures[0] for future in futures)
+    renderer.pool = None
+
+
+def test_missing_template(api, renderer):
+    with pytest.raises(api.CertificateTemplateNotFound):
+        renderer.submit("PitchMaster", dict(FIELDS))
+
+
+def loaded_modules():
+    return set(sys.modules)
+
+
+def test_render_workers_do_not_load_the_api(renderer):
+    with renderer.lock:
+        pool = renderer._get_pool()
+    modules = pool.submit(loaded_modules).result(timeout=30)
+
+    assert "StudentNFTAPI" not in modules and "flask" not in modules and "web3" not in modules
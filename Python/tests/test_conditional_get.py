@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+
+
+def test_balance_version_changes_with_every_write(backend):
+    assert backend.get_balance_state("0xabc") == (0, 0, None)
+    backend.initialize_tokens("0xabc", 100)
+    tokens, version, updated_at = backend.get_balance_state("0xabc")
+    assert tokens == 100 and updated_at is not None
+    backend.add_tokens("0xabc", 5)
+    backend.deduct_tokens("0xabc", 5)
+    assert backend.get_balance_state("0xabc")[:2] == (100, version + 2)
+    backend.deduct_tokens("0xabc", 1000)
+    assert backend.get_balance_state("0xabc")[1] == version + 2
+
+
+def test_balance_etag(api, client):
+    client.post("/initialize_user", json={"user_address": ALICE})
+    first = client.get(f"/get_user_balance/{ALICE}")
+    etag = first.headers["ETag"]
+
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert client.get(f"/get_user_balance/{ALICE}", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/initialize_user", json={"user_address": BOB})
+    assert client.get(f"/get_user_balance/{ALICE}", headers={"If-None-Match": etag}).status_code == 304
+
+    api.state.add_tokens(ALICE, 50)
+    changed = client.get(f"/get_user_balance/{ALICE}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.get_json()["tokens"] == first.get_json()["tokens"] + 50
+
+
+def test_balance_if_modified_since(client):
+    client.post("/initialize_user", json={"user_address": ALICE})
+    last_modified = client.get(f"/get_user_balance/{ALICE}").headers["Last-Modified"]
+
+    assert client.get(f"/get_user_balance/{ALICE}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    earlier = format_datetime(datetime(2000, 1, 1, tzinfo=timezone.utc), usegmt=True)
+    assert client.get(f"/get_user_balance/{ALICE}", headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_question_poll_is_not_modified_until_answered(api, client):
+    session_id = client.post("/start_quiz", json={"user_address": ALICE}).get_json()["session_id"]
+    etag = client.get(f"/get_question/{session_id}").headers["ETag"]
+    assert client.get(f"/get_question/{session_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/submit_answer", json={"session_id": session_id, "answer": 0})
+    assert client.get(f"/get_question/{session_id}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_unchanged_bodies_are_built_once(api, client):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"value": len(builds)}
+
+    def get(version):
+        with api.app.test_request_context("/probe"):
+            return api.conditional_json(["probe", version], None, build)
+
+    assert get(1).get_json() == get(1).get_json() == {"value": 1}
+    assert get(2).get_json() == {"value": 2}
+    assert len(builds) == 2
+
+
+def test_partial_bodies_are_not_cached(api, client):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"value": len(builds)}, False
+
+    for _ in range(2):
+        with api.app.test_request_context("/probe"):
+            api.conditional_json(["probe", 1], None, build)
+    assert len(builds) == 2
+
+
+def test_response_body_cache_is_lru(api):
+    cache = api.ResponseBodyCache(2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.put("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+
+
+def test_sqlite_epoch_survives_reopen(api, tmp_path):
+    db_path = str(tmp_path / "state.db")
+    assert api.SQLiteStateBackend(db_path).epoch == api.SQLiteStateBackend(db_path).epoch
+
+
+def test_memory_epoch_is_per_instance(api):
+    assert api.InMemoryStateBackend().epoch != api.InMemoryStateBackend().epoch
+
+
+def test_restarted_backend_invalidates_etags(api, client, monkeypatch):
+    client.post("/initialize_user", json={"user_address": ALICE})
+    etag = client.get(f"/get_user_balance/{ALICE}").headers["ETag"]
+
+    # A restarted in-memory backend counts versions from scratch again
+    monkeypatch.setattr(api, "state", api.InMemoryStateBackend())
+    api.state.initialize_tokens(ALICE, 1)
+    response = client.get(f"/get_user_balance/{ALICE}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.get_json()["tokens"] == 1
@@ -0,0 +1,134 @@
+import json
+import threading
+
+from flask import jsonify
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+
+
+def test_idempotency_claim_and_replay(backend):
+    assert backend.claim_idempotency_key("k1", "fp", 1000.0) == ("claimed", None)
+    assert backend.claim_idempotency_key("k1", "fp", 1001.0) == ("pending", None)
+    assert backend.claim_idempotency_key("k1", "other", 1001.0) == ("mismatch", None)
+
+    backend.complete_idempotency_key("k1", 200, b'{"ok":true}')
+    assert backend.claim_idempotency_key("k1", "fp", 1002.0) == ("done", (200, b'{"ok":true}'))
+    assert backend.claim_idempotency_key("k1", "other", 1002.0) == ("mismatch", None)
+
+
+def test_idempotency_release_allows_retry(backend):
+    assert backend.claim_idempotency_key("k1", "fp", 1000.0) == ("claimed", None)
+    backend.release_idempotency_key("k1")
+    assert backend.claim_idempotency_key("k1", "fp", 1001.0) == ("claimed", None)
+
+
+def test_idempotency_expiry(api, backend):
+    assert backend.claim_idempotency_key("k1", "fp", 1000.0) == ("claimed", None)
+    stalled = 1000.0 + api.IDEMPOTENCY_PENDING_TIMEOUT
+    assert backend.claim_idempotency_key("k1", "fp", stalled) == ("claimed", None)
+
+    backend.complete_idempotency_key("k1", 201, b"{}")
+    expired = stalled + api.IDEMPOTENCY_TTL_SECONDS
+    assert backend.claim_idempotency_key("k1", "other", expired) == ("claimed", None)
+
+
+def test_idempotency_key_limit(api, backend, monkeypatch):
+    monkeypatch.setattr(api, "IDEMPOTENCY_MAX_KEYS", 2)
+    for i, key in enumerate(("k1", "k2", "k3")):
+        assert backend.claim_idempotency_key(key, "fp", 1000.0 + i) == ("claimed", None)
+    assert backend.claim_idempotency_key("k3", "fp", 1004.0) == ("pending", None)
+    assert backend.claim_idempotency_key("k1", "fp", 1004.0) == ("claimed", None)
+
+
+def test_concurrent_claims_admit_one(backend):
+    outcomes = []
+    barrier = threading.Barrier(8)
+
+    def claim():
+        barrier.wait()
+        outcomes.append(backend.claim_idempotency_key("k1", "fp", 1000.0)[0])
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ["claimed"] + ["pending"] * 7
+
+
+
+def test_idempotent_replays_successes(api, client):
+    calls = []
+
+    @api.idempotent
+    def view():
+        calls.append(1)
+        return jsonify({"call": len(calls)})
+
+    def request(body, key="key-1"):
+        with api.app.test_request_context("/mintBadge", method="POST", data=json.dumps(body),
+                                          content_type="application/json", headers={"Idempotency-Key": key}):
+            return api.app.make_response(view())
+
+    first = request({"user_address": ALICE})
+    replay = request({"user_address": ALICE})
+    assert replay.get_json() == first.get_json() == {"call": 1}
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert request({"user_address": BOB}).status_code == 422
+    assert request({"user_address": BOB}, key="key-2").get_json() == {"call": 2}
+    assert request({"user_address": ALICE}, key="k" * 256).status_code == 400
+
+
+def test_idempotent_releases_failures(api, client):
+    statuses = iter([500, 200])
+
+    @api.idempotent
+    def view():
+        status = next(statuses)
+        return jsonify({"status": status}), status
+
+    def request():
+        with api.app.test_request_context("/uploadMetadata", method="POST", data="{}",
+                                          content_type="application/json", headers={"Idempotency-Key": "retry"}):
+            return api.app.make_response(view())
+
+    assert request().status_code == 500
+    assert request().status_code == 200
+    replay = request()
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.get_json() == {"status": 200}
+
+
+def test_idempotent_duplicate_waits_for_the_original(api, client, monkeypatch):
+    monkeypatch.setattr(api, "IDEMPOTENCY_POLL_INTERVAL", 0.01)
+
+    @api.idempotent
+    def view():
+        raise AssertionError("the duplicate must not run the view")
+
+    # The original request is still running in another worker
+    api.state.claim_idempotency_key("/mintBadge:in-flight", api.hashlib.sha256(b"{}").hexdigest(), api.time.time())
+    threading.Timer(0.05, api.state.complete_idempotency_key,
+                    ("/mintBadge:in-flight", 200, b'{"ok":true}')).start()
+    with api.app.test_request_context("/mintBadge", method="POST", data="{}", content_type="application/json",
+                                      headers={"Idempotency-Key": "in-flight"}):
+        replay = api.app.make_response(view())
+
+    assert replay.get_json() == {"ok": True}
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+
+def test_requests_without_a_key_always_run(api, client):
+    calls = []
+
+    @api.idempotent
+    def view():
+        calls.append(1)
+        return jsonify({})
+
+    for _ in range(2):
+        with api.app.test_request_context("/mintBadge", method="POST", data="{}", content_type="application/json"):
+            view()
+    assert len(calls) == 2
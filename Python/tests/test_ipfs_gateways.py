@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import time
+
+import pytest
+
+HELLO_WORLD_CID = "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+
+
+def raw_cid(content):
+    cid = bytes([0x01, 0x55, 0x12, 0x20]) + hashlib.sha256(content).digest()
+    return "b" + base64.b32encode(cid).decode().lower().rstrip("=")
+
+
+def test_verify_ipfs_content_dag_pb(api):
+    assert api.verify_ipfs_content(HELLO_WORLD_CID, b"hello world\n") is True
+    assert api.verify_ipfs_content(HELLO_WORLD_CID, b"hello world!\n") is False
+
+
+def test_verify_ipfs_content_raw_cidv1(api):
+    cid = raw_cid(b'{"name": "Top Quizzer"}')
+    assert api.verify_ipfs_content(cid, b'{"name": "Top Quizzer"}') is True
+    assert api.verify_ipfs_content(cid, b'{"name": "Top Innovator"}') is False
+
+
+def test_verify_ipfs_content_unverifiable(api):
+    assert api.verify_ipfs_content(HELLO_WORLD_CID + "/metadata.json", b"{}") is None
+    assert api.verify_ipfs_content(HELLO_WORLD_CID, b"x" * (api.UNIXFS_CHUNK_SIZE + 1)) is None
+    assert api.verify_ipfs_content("zNotACid", b"") is None
+    assert api.verify_ipfs_content("Qm0OIl", b"") is False
+
+
+class FakeGateway:
+    def __init__(self, name, content, delay=0.0, error=None):
+        self.name = name
+        self.content = content
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def fetch(self, ipfs_path, timeout):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.content
+
+
+def test_gateway_pool_skips_tampered_content(api):
+    tampered = FakeGateway("tampered", b"hello mars\n")
+    honest = FakeGateway("honest", b"hello world\n", delay=0.05)
+    pool = api.GatewayPool([tampered, honest], timeout=2)
+
+    assert pool.fetch(HELLO_WORLD_CID) == b"hello world\n"
+    assert pool.ranked()[0] is honest
+
+
+def test_gateway_pool_hedges_past_a_slow_gateway(api):
+    slow = FakeGateway("slow", b"hello world\n", delay=2.0)
+    fast = FakeGateway("fast", b"hello world\n")
+    pool = api.GatewayPool([slow, fast], timeout=5)
+
+    started = time.monotonic()
+    assert pool.fetch(HELLO_WORLD_CID) == b"hello world\n"
+    assert time.monotonic() - started < 1.5
+    assert fast.calls == 1
+
+
+def test_gateway_pool_prefers_healthy_gateways(api):
+    broken = FakeGateway("broken", b"", error=ConnectionError("refused"))
+    healthy = FakeGateway("healthy", b"hello world\n")
+    pool = api.GatewayPool([broken, healthy], timeout=2)
+
+    for _ in range(3):
+        assert pool.fetch(HELLO_WORLD_CID) == b"hello world\n"
+    assert pool.ranked() == [healthy, broken]
+    assert broken.calls == 1
+    snapshot = {row["gateway"]: row for row in pool.snapshot()}
+    assert snapshot["broken"]["error_rate"] > 0 and snapshot["healthy"]["latency_ewma_ms"] is not None
+
+
+def test_gateway_pool_fails_when_every_gateway_fails(api):
+    pool = api.GatewayPool([FakeGateway("a", b"hello mars\n"), FakeGateway("b", b"", error=ConnectionError("down"))],
+                           timeout=1)
+    with pytest.raises(api.requests.RequestException, match="All gateways failed"):
+        pool.fetch(HELLO_WORLD_CID)
+
+
+def test_gateway_pool_uses_validate_for_paths(api):
+    gateway = FakeGateway("only", b"not json")
+    pool = api.GatewayPool([gateway], timeout=1)
+
+    with pytest.raises(api.requests.RequestException):
+        pool.fetch(HELLO_WORLD_CID + "/metadata.json", validate=api.is_json_document)
+    assert pool.fetch(HELLO_WORLD_CID + "/notes.txt") == b"not json"
+
+
+def test_http_gateway_and_uri_rewriting(api, http_stub):
+    http_stub.respond = lambda method, path, headers, body: (
+        (200, "text/plain", b"hello world\n") if path == f"/ipfs/{HELLO_WORLD_CID}" else (404, "text/plain", b""))
+    pool = api.GatewayPool([api.HTTPGateway(http_stub.url + "/ipfs/")], timeout=2)
+
+    # Any gateway URL is rewritten onto the pool
+    assert pool.fetch_uri(f"https://gateway.example/ipfs/{HELLO_WORLD_CID}") == b"hello world\n"
+    assert http_stub.requests[0][1] == f"/ipfs/{HELLO_WORLD_CID}"
+    with pytest.raises(api.requests.RequestException):
+        pool.fetch(HELLO_WORLD_CID + "/missing.json")
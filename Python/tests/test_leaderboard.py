@@ -0,0 +1,64 @@
+from datetime import datetime
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+
+
+def test_ranked_board(api):
+    board = api.RankedBoard()
+    board.set_score("0xa", 10)
+    board.set_score("0xb", 20)
+    board.add_score("0xa", 15)
+    board.set_score("0xc", 20)
+
+    assert board.top(10) == [("0xa", 25), ("0xb", 20), ("0xc", 20)]
+    assert board.top(1) == [("0xa", 25)]
+
+
+def test_token_leaderboard(backend):
+    backend.initialize_tokens("0xa", 10)
+    backend.initialize_tokens("0xb", 30)
+    backend.initialize_tokens("0xc", 20)
+    backend.add_tokens("0xa", 25)
+    backend.deduct_tokens("0xc", 15)
+
+    assert backend.top_tokens(2) == [("0xa", 35), ("0xb", 30)]
+    assert backend.top_tokens(10)[-1] == ("0xc", 5)
+
+
+def test_quiz_leaderboard_periods(api, backend):
+    when = datetime(2026, 10, 19)
+    backend.record_quiz_score("0xa", 3, when)
+    backend.record_quiz_score("0xb", 5, when)
+    backend.record_quiz_score("0xa", 4, datetime(2026, 11, 2))
+
+    keys = api.leaderboard_period_keys(when)
+    assert keys == {"all": "all", "month": "month:2026-10", "week": "week:2026-W43"}
+    assert backend.top_quiz_scores("all", 10) == [("0xa", 7), ("0xb", 5)]
+    assert backend.top_quiz_scores(keys["month"], 10) == [("0xb", 5), ("0xa", 3)]
+    assert backend.top_quiz_scores(keys["week"], 1) == [("0xb", 5)]
+    assert backend.top_quiz_scores("week:1999-W01", 10) == []
+
+
+def test_leaderboard_endpoint(api, client):
+    api.state.initialize_tokens(ALICE, 100)
+    api.state.initialize_tokens(BOB, 150)
+    api.state.record_quiz_score(ALICE, 50, datetime.now())
+
+    leaders = client.get("/leaderboard?limit=100000").get_json()["leaders"]
+    assert [(row["rank"], row["user_address"], row["score"]) for row in leaders] == [(1, BOB, 150), (2, ALICE, 100)]
+    quiz = client.get("/leaderboard?board=quiz&period=week").get_json()
+    assert (quiz["period"], quiz["leaders"][0]["score"]) == ("week", 50)
+
+    assert client.get("/leaderboard?limit=ten").status_code == 400
+    assert client.get("/leaderboard?board=quiz&period=decade").status_code == 400
+    assert client.get("/leaderboard?board=gas").status_code == 400
+
+
+def test_leaderboard_limit_is_at_least_one(api, client):
+    api.state.initialize_tokens(ALICE, 100)
+    api.state.initialize_tokens(BOB, 105)
+
+    for limit in ("0", "-5"):
+        leaders = client.get(f"/leaderboard?limit={limit}").get_json()["leaders"]
+        assert [row["user_address"] for row in leaders] == [BOB]
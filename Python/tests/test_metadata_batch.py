@@ -0,0 +1,95 @@
+import json
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import pytest
+from PIL import Image
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+CAROL = "0x" + "c3" * 20
+
+
+@pytest.fixture
+def pinata(api, http_stub, monkeypatch, tmp_path):
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    Image.new("RGB", (400, 300), "navy").save(templates / "TopQuizzer.png")
+    renderer = api.CertificateRenderer(str(templates), str(tmp_path / "rendered"), 1)
+    monkeypatch.setattr(api, "certificate_renderer", renderer)
+
+    directory_cids = iter(["bafyimages", "bafymetadata"])
+    http_stub.respond = lambda method, path, headers, body: (
+        200, "application/json", json.dumps({"IpfsHash": next(directory_cids)}).encode())
+    monkeypatch.setattr(api, "pinataPinFileURL", http_stub.url + "/pinning/pinFileToIPFS")
+    monkeypatch.setattr(api, "IPFS_GATEWAY_URL", "https://gateway.test/ipfs")
+    yield http_stub
+    if renderer.pool is not None:
+        renderer.pool.shutdown()
+
+
+def multipart_parts(headers, body):
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {headers['Content-Type']}\r\n\r\n".encode() + body)
+    return [(part.get_param("name", header="content-disposition"), part.get_filename(), part.get_content())
+            for part in message.iter_parts()]
+
+
+def student(name, address):
+    return {"student_name": name, "class_semester": "CSE 5", "university": "PES", "user_address": address}
+
+
+def test_batch_pins_two_directories(api, client, badge_log, pinata):
+    api.initialize_user_tokens(ALICE)
+    api.initialize_user_tokens(BOB)
+    api.initialize_user_tokens(CAROL, 100)
+    response = client.post("/uploadMetadataBatch", json={
+        "badge_type": "TopQuizzer",
+        "students": [student("Alice", ALICE), student("Bob", BOB), student("Carol", CAROL)]
+    })
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [s["student_name"] for s in body["skipped"]] == ["Carol"]
+    assert (body["image_dir_cid"], body["metadata_dir_cid"]) == ("bafyimages", "bafymetadata")
+    assert [r["metadata_uri"] for r in body["badges"]] == [
+        "https://gateway.test/ipfs/bafymetadata/0000-Alice.json",
+        "https://gateway.test/ipfs/bafymetadata/0001-Bob.json"
+    ]
+    assert body["badges"][1]["image_uri"] == "https://gateway.test/ipfs/bafyimages/0001-Bob.png"
+
+    # Exactly one request per directory
+    assert [(method, path) for method, path, _, _ in pinata.requests] == [("POST", "/pinning/pinFileToIPFS")] * 2
+    image_parts, metadata_parts = (multipart_parts(headers, body) for _, _, headers, body in pinata.requests)
+    image_dir = json.loads(image_parts[-2][2])["name"]
+    assert [filename for _, filename, _ in image_parts[:-2]] == [f"{image_dir}/0000-Alice.png",
+                                                                 f"{image_dir}/0001-Bob.png"]
+    assert image_parts[0][2].startswith(b"\x89PNG")
+    assert [name for name, _, _ in image_parts[-2:]] == ["pinataMetadata", "pinataOptions"]
+    assert json.loads(image_parts[-1][2]) == {"cidVersion": 1}
+    assert json.loads(metadata_parts[-1][2]) == {"cidVersion": 1}
+
+    metadata_dir = json.loads(metadata_parts[-2][2])["name"]
+    assert metadata_parts[0][1] == f"{metadata_dir}/0000-Alice.json"
+    document = json.loads(metadata_parts[0][2])
+    assert document["image_path"] == "bafyimages/0000-Alice.png" and "image_cid" not in document
+    assert document["certificate_url"] == "https://gateway.test/ipfs/bafyimages/0000-Alice.png"
+    assert document["attributes"][0] == {"Student": "Alice"}
+
+    with open(api.STUDENT_BADGE_DATA) as f:
+        assert [r["metadata_uri"] for r in json.load(f)] == [r["metadata_uri"] for r in body["badges"]]
+
+
+def test_batch_without_eligible_students_pins_nothing(api, client, badge_log, pinata):
+    api.initialize_user_tokens(CAROL, 100)
+    response = client.post("/uploadMetadataBatch", json={"badge_type": "TopQuizzer",
+                                                         "students": [student("Carol", CAROL)]})
+
+    assert response.status_code == 400
+    assert pinata.requests == []
+
+
+def test_batch_rejects_a_failed_pin(api, client, badge_log, pinata):
+    pinata.respond = lambda method, path, headers, body: (500, "text/plain", b"quota exceeded")
+    with pytest.raises(api.requests.HTTPError, match="quota exceeded"):
+        api.pinDirectoryToPinata("cohort", {"a.json": b"{}"})
@@ -0,0 +1,55 @@
+import pytest
+
+
+@pytest.fixture
+def fees(api, chain, monkeypatch):
+    monkeypatch.setattr(api.mint_watcher, "last_block", None)
+    return api.MintFeeStrategy(safety_margin=1.5, bucket_size=64, fee_cache_seconds=3600)
+
+
+def test_gas_limit_is_estimated_once_per_uri_bucket(fees, chain):
+    short = fees.gas_limit("TopQuizzer", "ipfs://" + "a" * 20)
+    assert fees.gas_limit("TopQuizzer", "ipfs://" + "b" * 40) == short
+    assert chain.calls["estimate_gas"] == 1
+
+    # Estimated for the longest URI in the bucket, plus the safety margin
+    assert short == int((100000 + 10 * 63) * 1.5)
+
+    assert fees.gas_limit("TopQuizzer", "ipfs://" + "c" * 100) > short
+    assert fees.gas_limit("PitchMaster", "ipfs://" + "a" * 20) == short
+    assert chain.calls["estimate_gas"] == 3
+
+
+def test_eip1559_fees_are_cached(fees, chain):
+    chain.base_fee = 5 * 10 ** 9
+
+    params = fees.transaction_params("TopQuizzer", "ipfs://meta")
+    assert params["maxFeePerGas"] == 2 * chain.base_fee + chain.eth.max_priority_fee
+    assert params["maxPriorityFeePerGas"] == chain.eth.max_priority_fee
+    assert "gasPrice" not in params
+
+    chain.base_fee = 7 * 10 ** 9
+    assert fees.fee_params() == {k: v for k, v in params.items() if k != "gas"}
+    assert chain.calls["get_block"] == 1
+
+
+def test_legacy_gas_price_without_base_fee(fees, chain):
+    assert fees.fee_params() == {"gasPrice": chain.eth.gas_price}
+
+
+def test_new_block_seen_by_watcher_refreshes_fees(api, fees, chain, monkeypatch):
+    chain.base_fee = 5 * 10 ** 9
+    fees.fee_params()
+    chain.mine()
+    chain.base_fee = 9 * 10 ** 9
+    monkeypatch.setattr(api.mint_watcher, "last_block", chain.eth.block_number)
+
+    assert fees.fee_params()["maxFeePerGas"] == 2 * chain.base_fee + chain.eth.max_priority_fee
+    assert chain.calls["get_block"] == 2
+
+
+def test_fees_expire(api, chain):
+    fees = api.MintFeeStrategy(safety_margin=1.5, bucket_size=64, fee_cache_seconds=0)
+    fees.fee_params()
+    fees.fee_params()
+    assert chain.calls["get_block"] == 2
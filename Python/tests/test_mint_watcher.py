@@ -0,0 +1,156 @@
+import json
+import threading
+
+import pytest
+
+ALICE = "0x" + "a1" * 20
+
+
+@pytest.fixture
+def watcher(api, chain, memory_state, badge_log):
+    # Polled by hand; the interval only keeps the background thread asleep
+    return api.MintReceiptWatcher(3600)
+
+
+@pytest.fixture
+def track(watcher, memory_state):
+    def track(tx_hash, token_uri="ipfs://meta-1"):
+        # As mintBadge does after deducting the tokens
+        memory_state.record_mint_charge(tx_hash, ALICE, token_uri, 300)
+        watcher.track(tx_hash, {"user_address": ALICE, "recipient": ALICE, "badge_type": "TopQuizzer",
+                                "token_uri": token_uri, "tokens_deducted": 300})
+    return track
+
+
+def test_minted_transaction_is_published(watcher, track, chain, badge_log):
+    badge_log.write_text(json.dumps([{"metadata_uri": "ipfs://meta-1", "student_name": "Alice"}]))
+    track("0x01")
+    assert watcher.status("0x01") == {"tx_hash": "0x01", "status": "pending"}
+
+    chain.mint("0x01", 7, "ipfs://meta-1")
+    watcher._poll()
+
+    assert watcher.status("0x01")["status"] == "minted"
+    assert watcher.status("0x01")["token_id"] == 7
+    record, = json.loads(badge_log.read_text())
+    assert (record["tx_hash"], record["mint_status"], record["token_id"]) == ("0x01", "minted", 7)
+
+
+def test_reverted_transaction_is_refunded(watcher, track, chain, memory_state):
+    track("0x01")
+    chain.revert("0x01")
+    watcher._poll()
+
+    outcome = watcher.status("0x01")
+    assert outcome["status"] == "reverted" and outcome["tokens_refunded"] == 300
+    assert "Badge limit reached" in outcome["error"]
+    assert memory_state.get_tokens(ALICE) == 300
+
+
+def test_each_block_is_read_once(watcher, track, chain):
+    track("0x01")
+    track("0x02")
+    chain.mine()
+    chain.mint("0x01", 1, "ipfs://meta-1")
+    watcher._poll()
+    blocks_read = chain.calls["get_block"]
+    watcher._poll()
+
+    assert chain.calls["get_block"] == blocks_read
+    assert watcher.status("0x01")["status"] == "minted"
+    assert watcher.status("0x02")["status"] == "pending"
+
+    chain.mint("0x02", 2, "ipfs://meta-2")
+    watcher._poll()
+    assert chain.calls["get_block"] == blocks_read + 1
+    assert watcher.status("0x02")["status"] == "minted"
+
+
+def test_transaction_mined_before_tracking_is_looked_up(watcher, track, chain):
+    track("0x01")
+    watcher._poll()
+    chain.mint("0x02", 2, "ipfs://meta-2")
+    watcher._poll()
+    # Tracked only after the block that includes it was scanned
+    watcher.pending["0x02"] = {"tx_hash": "0x02", "user_address": ALICE, "recipient": ALICE, "badge_type": "TopQuizzer",
+                               "token_uri": "ipfs://meta-2", "tokens_deducted": 300, "submitted_block": 1}
+    watcher._poll()
+
+    assert watcher.status("0x02")["status"] == "minted"
+    assert chain.calls["get_transaction_receipt"] == 1
+
+
+def test_blocks_mined_while_idle_are_skipped(watcher, track, chain):
+    track("0x01")
+    chain.mint("0x01", 1, "ipfs://meta-1")
+    watcher._poll()
+    for _ in range(50):
+        chain.mine()
+
+    blocks_read = chain.calls["get_block"]
+    track("0x02")
+    chain.mint("0x02", 2, "ipfs://meta-2")
+    watcher._poll()
+
+    # Only the block after tracking started is read, not the 50 idle ones
+    assert chain.calls["get_block"] - blocks_read <= 2
+    assert watcher.status("0x02")["status"] == "minted"
+
+
+def test_refund_survives_a_corrupt_badge_log(watcher, track, chain, memory_state, badge_log):
+    badge_log.write_text("[{not json")
+    track("0x01")
+    chain.revert("0x01")
+
+    with pytest.raises(ValueError):
+        watcher._poll()
+    # The next polls must not see the transaction as pending again
+    watcher._poll()
+    watcher._poll()
+
+    assert watcher.status("0x01")["status"] == "reverted"
+    assert memory_state.get_tokens(ALICE) == 300
+    assert memory_state.open_mint_charges() == []
+
+
+def test_revert_without_a_pending_charge_refunds_nothing(watcher, track, chain, memory_state):
+    track("0x01")
+    # Already settled elsewhere, e.g. by another worker's watcher
+    memory_state.refund_mint_charge("0x01")
+    chain.revert("0x01")
+    watcher._poll()
+
+    assert watcher.status("0x01")["tokens_refunded"] == 0
+    assert memory_state.get_tokens(ALICE) == 300
+
+
+def test_refund_mint_charge_is_conditional(backend):
+    backend.record_mint_charge("0x01", ALICE, "ipfs://a", 300)
+    backend.record_mint_charge("0x02", ALICE, "ipfs://b", 300)
+    backend.settle_mint_charge("0x02", "minted")
+
+    assert backend.refund_mint_charge("0x01") == 300
+    assert backend.refund_mint_charge("0x01") == 0
+    assert backend.refund_mint_charge("0x02") == 0
+    assert backend.refund_mint_charge("0xmissing") == 0
+    assert backend.get_tokens(ALICE) == 300
+    assert backend.open_mint_charges() == []
+
+
+def test_concurrent_refunds_credit_once(backend):
+    backend.record_mint_charge("0x01", ALICE, "ipfs://a", 300)
+    barrier = threading.Barrier(8)
+    refunded = []
+
+    def refund():
+        barrier.wait()
+        refunded.append(backend.refund_mint_charge("0x01"))
+
+    threads = [threading.Thread(target=refund) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(refunded) == [0] * 7 + [300]
+    assert backend.get_tokens(ALICE) == 300
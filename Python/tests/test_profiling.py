@@ -0,0 +1,101 @@
+import marshal
+import time
+
+import pytest
+
+TOKEN = {"X-Profile-Token": "secret"}
+
+
+@pytest.fixture
+def profiles(api, monkeypatch):
+    monkeypatch.setattr(api, "PROFILE_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(api, "PROFILE_SAMPLE_RATE", 0)
+    store = api.ProfileStore(3)
+    monkeypatch.setattr(api, "profile_store", store)
+    return store
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def profile_request(api, headers, seconds=0.05, path="/leaderboard"):
+    # The before/after hooks are only installed when profiling is configured at startup
+    with api.app.test_request_context(path, headers=headers):
+        api.start_request_profile()
+        busy_work(seconds)
+        api.finish_request_profile(None)
+
+
+def test_sampled_profile_has_collapsed_stacks(api, profiles):
+    profile_request(api, TOKEN)
+
+    profile, = profiles.profiles
+    assert (profile["mode"], profile["path"], profile["method"]) == ("sample", "/leaderboard", "GET")
+    assert profile["duration_ms"] >= 50
+    stack, count = profile["collapsed"].splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_work" in line for line in profile["collapsed"].splitlines())
+
+
+def test_cprofile_mode(api, profiles):
+    profile_request(api, dict(TOKEN, **{"X-Profile-Mode": "cprofile"}), seconds=0.01)
+
+    profile, = profiles.profiles
+    assert profile["mode"] == "cprofile"
+    assert any(line.startswith("busy_work (") and "builtins.sum" in line for line in profile["collapsed"].splitlines())
+    stats = marshal.loads(profile["pstats"])
+    assert any(name == "busy_work" for _, _, name in stats)
+
+
+def test_requests_are_not_profiled_without_token(api, profiles):
+    profile_request(api, {"X-Profile-Token": "wrong"}, seconds=0)
+    profile_request(api, {"X-Profile-Token": "secreT"}, seconds=0)
+    profile_request(api, {"X-Profile-Token": "s\u00e9cret"}, seconds=0)
+    profile_request(api, {}, seconds=0)
+    assert not profiles.profiles
+
+
+def test_sample_rate(api, profiles, monkeypatch):
+    monkeypatch.setattr(api, "PROFILE_SAMPLE_RATE", 1.0)
+    profile_request(api, {}, seconds=0.01)
+    profile_request(api, TOKEN, seconds=0, path="/admin/profiles")
+    assert len(profiles.profiles) == 1
+
+
+def test_sampled_requests_ignore_the_mode_header(api, profiles, monkeypatch):
+    monkeypatch.setattr(api, "PROFILE_SAMPLE_RATE", 1.0)
+    profile_request(api, {"X-Profile-Mode": "cprofile"}, seconds=0.01)
+    profile_request(api, dict(TOKEN, **{"X-Profile-Mode": "cprofile"}), seconds=0.01)
+
+    assert [profile["mode"] for profile in profiles.profiles] == ["sample", "cprofile"]
+
+
+def test_profile_store_keeps_the_newest(api, profiles):
+    for i in range(5):
+        profiles.add({"id": str(i), "collapsed": "", "duration_ms": i})
+
+    assert [p["id"] for p in profiles.summaries()] == ["4", "3", "2"]
+    assert profiles.get("1") is None and profiles.get("3")["duration_ms"] == 3
+
+
+def test_profile_endpoints(api, client, profiles):
+    profile_request(api, TOKEN, seconds=0.02)
+    profile_request(api, dict(TOKEN, **{"X-Profile-Mode": "cprofile"}), seconds=0.01)
+    sample_id, cprofile_id = [p["id"] for p in profiles.profiles]
+
+    assert client.get("/admin/profiles").status_code == 403
+    listed = client.get("/admin/profiles", headers=TOKEN).get_json()["profiles"]
+    assert [p["id"] for p in listed] == [cprofile_id, sample_id]
+    assert "collapsed" not in listed[0]
+
+    folded = client.get(f"/admin/profiles/{sample_id}", headers=TOKEN)
+    assert folded.mimetype == "text/plain" and "busy_work" in folded.get_data(as_text=True)
+    assert client.get(f"/admin/profiles/{sample_id}?format=pstats", headers=TOKEN).status_code == 400
+    pstats = client.get(f"/admin/profiles/{cprofile_id}?format=pstats", headers=TOKEN)
+    assert marshal.loads(pstats.get_data())
+    assert client.get("/admin/profiles/unknown", headers=TOKEN).status_code == 404
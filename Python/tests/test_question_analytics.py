@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+
+ALICE = "0x" + "a1" * 20
+
+
+def test_compute_question_analytics(api):
+    # Respondent 0 answers both questions right, respondent 1 gets both wrong
+    result = api.compute_question_analytics(
+        np.array([1, 2, 1, 2], dtype=np.int32),
+        np.array([0, 3, 2, -1], dtype=np.int8),
+        np.array([True, True, False, False]),
+        np.array([2.0, 4.0, np.nan, 6.0], dtype=np.float32),
+        np.array([0, 0, 1, 1], dtype=np.int32))
+
+    assert [r["question_id"] for r in result] == [1, 2]
+    first, second = result
+    assert first["attempts"] == 2 and first["accuracy"] == 0.5
+    assert first["option_distribution"] == [1, 0, 1, 0]
+    assert second["option_distribution"] == [0, 0, 0, 1]
+    assert first["discrimination_index"] == 1.0
+    assert first["mean_time_to_answer"] == 2.0 and first["median_time_to_answer"] == 2.0
+    assert second["mean_time_to_answer"] == 5.0
+
+
+def test_compute_question_analytics_empty(api):
+    empty = np.array([], dtype=np.int32)
+    assert api.compute_question_analytics(empty, empty, empty, empty, empty) == []
+
+
+def test_answer_event_buffer_grows(api):
+    buffer = api.AnswerEventBuffer(2)
+    for i in range(5):
+        buffer.append(f"s{i % 2}", i, i % 4, i % 2 == 0, None if i == 3 else float(i))
+
+    question_ids, chosen, correct, latencies, respondents = buffer.snapshot()
+    assert question_ids.tolist() == [0, 1, 2, 3, 4]
+    assert correct.tolist() == [True, False, True, False, True]
+    assert np.isnan(latencies[3]) and latencies[4] == 4.0
+    assert respondents.tolist() == [0, 1, 0, 1, 0]
+
+
+def test_answer_event_columns(backend):
+    question_ids, chosen, correct, latencies, respondents = backend.answer_event_columns()
+    assert len(question_ids) == len(respondents) == 0
+
+    backend.record_answer_event("s1", 1, 2, True, 1.5)
+    backend.record_answer_event("s2", 1, 0, False, None)
+    backend.record_answer_event("s1", 2, 999, False, 3.0)
+
+    question_ids, chosen, correct, latencies, respondents = backend.answer_event_columns()
+    assert question_ids.tolist() == [1, 1, 2]
+    assert chosen.tolist() == [2, 0, -1]
+    assert correct.tolist() == [True, False, False]
+    assert latencies[0] == pytest.approx(1.5) and np.isnan(latencies[1])
+    assert respondents[0] == respondents[2] != respondents[1]
+
+
+
+def test_sqlite_columns_are_shared_and_read_incrementally(api, tmp_path):
+    db_path = str(tmp_path / "state.db")
+    worker, other_worker = api.SQLiteStateBackend(db_path), api.SQLiteStateBackend(db_path)
+    events = 200000
+    conn = worker._conn()
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO answer_respondents (session_id) VALUES (?)", ((f"s{i}",) for i in range(events // 5)))
+    conn.executemany(
+        "INSERT INTO answer_events (respondent_id, question_id, chosen_option, correct, latency) VALUES (?, ?, ?, ?, ?)",
+        ((i // 5 + 1, i % 20, i % 4, i % 3 == 0, 1.5) for i in range(events)))
+    conn.execute("COMMIT")
+
+    assert len(worker.answer_event_columns()[0]) == events
+
+    other_worker.record_answer_event("s-new", 7, 1, True, None)
+    started = time.perf_counter()
+    question_ids, chosen, correct, latencies, respondents = worker.answer_event_columns()
+    # Only the new event is read from the database
+    assert time.perf_counter() - started < 0.25
+    assert len(question_ids) == events + 1
+    assert (question_ids[-1], chosen[-1], correct[-1]) == (7, 1, True) and np.isnan(latencies[-1])
+    assert respondents[-1] == events // 5 and respondents.max() == events // 5
+
+
+def test_analytics_endpoint_counts_quiz_answers(api, client):
+    session_id = client.post("/start_quiz", json={"user_address": ALICE}).get_json()["session_id"]
+    for question in api.state.get_session(session_id)["questions"]:
+        client.get(f"/get_question/{session_id}")
+        client.post("/submit_answer", json={"session_id": session_id, "answer": question["correct_answer"]})
+
+    report = client.get("/analytics/questions").get_json()
+    assert report["total_answers"] == 5
+    assert all(row["accuracy"] == 1.0 and row["attempts"] == 1 for row in report["questions"])
+    assert all(row["mean_time_to_answer"] is not None for row in report["questions"])
@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+ALICE = "0x" + "a1" * 20
+
+
+def start_quiz(client, user_address):
+    return client.post("/start_quiz", json={"user_address": user_address}).get_json()["session_id"]
+
+
+def parse_event(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+    return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+
+def test_notifier_wakes_only_the_answered_session(api):
+    notifier = api.SessionChangeNotifier()
+    notifier.subscribe("s1")
+    notifier.subscribe("s2")
+    seen = notifier.generation("s1")
+    threading.Timer(0.05, notifier.notify, ("s1",)).start()
+
+    started = time.monotonic()
+    notifier.wait("s1", seen, 5)
+    assert time.monotonic() - started < 1
+    assert notifier.generation("s1") == seen + 1
+    assert notifier.generation("s2") == 0
+
+
+def test_notifier_wait_times_out(api):
+    notifier = api.SessionChangeNotifier()
+    notifier.subscribe("s1")
+    notifier.notify("s2")
+    started = time.monotonic()
+    notifier.wait("s1", notifier.generation("s1"), 0.05)
+    assert time.monotonic() - started >= 0.05
+
+
+def test_notifier_forgets_sessions_without_subscribers(api):
+    notifier = api.SessionChangeNotifier()
+    notifier.subscribe("s1")
+    notifier.subscribe("s1")
+    notifier.unsubscribe("s1")
+    notifier.notify("s1")
+    assert notifier.generation("s1") == 1
+    notifier.unsubscribe("s1")
+    assert notifier.sessions == {}
+
+
+def test_channel_pushes_each_answer(api, client):
+    session_id = start_quiz(client, ALICE)
+    questions = api.state.get_session(session_id)["questions"]
+    response = client.get(f"/quiz_channel/{session_id}", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    events = response.response
+
+    kind, event_id, first = parse_event(next(events))
+    assert (kind, event_id) == ("quiz", 0)
+    assert first["answered"] is None and first["question"]["question_number"] == 1
+    assert first["question"]["question"] == questions[0]["question"]
+
+    tokens = first["total_tokens"]
+    for i, question in enumerate(questions):
+        client.post("/submit_answer", json={"session_id": session_id, "answer": question["correct_answer"]})
+        _, event_id, event = parse_event(next(events))
+        assert event_id == i + 1
+        assert event["answered"]["correct"] is True
+        assert event["total_tokens"] == tokens + (i + 1) * api.TOKENS_PER_CORRECT_ANSWER
+
+    assert event["quiz_completed"] and event["question"] is None
+    assert event["final_score"] == f"{len(questions)}/{len(questions)}"
+    assert list(events) == []
+    response.close()
+    assert api.session_notifier.sessions == {}
+
+
+def test_channel_rejects_unknown_session(client):
+    assert client.get("/quiz_channel/missing").status_code == 400
@@ -0,0 +1,37 @@
+ALICE = "0x" + "a1" * 20
+
+
+def start_quiz(client, user_address):
+    return client.post("/start_quiz", json={"user_address": user_address}).get_json()["session_id"]
+
+
+def test_quiz_flow(api, client):
+    session_id = start_quiz(client, ALICE)
+    session = api.state.get_session(session_id)
+    initial_tokens = api.state.get_tokens(ALICE)
+
+    for i, question in enumerate(session["questions"]):
+        assert client.get(f"/get_question/{session_id}").status_code == 200
+        answer = question["correct_answer"] if i % 2 == 0 else question["correct_answer"] + 1
+        result = client.post("/submit_answer", json={"session_id": session_id, "answer": answer}).get_json()
+        assert result["correct"] == (i % 2 == 0)
+
+    assert result["quiz_completed"] and result["final_score"] == "3/5"
+    summary = client.get(f"/quiz_summary/{session_id}").get_json()
+    assert summary["current_total_tokens"] == initial_tokens + 3 * api.TOKENS_PER_CORRECT_ANSWER
+    assert client.get(f"/get_question/{session_id}").status_code == 400
+
+
+def test_double_submit_is_rejected(api, client, monkeypatch):
+    session_id = start_quiz(client, ALICE)
+    stale = api.state.get_session(session_id)
+    initial_tokens = api.state.get_tokens(ALICE)
+    answer = stale["questions"][0]["correct_answer"]
+
+    assert client.post("/submit_answer", json={"session_id": session_id, "answer": answer}).status_code == 200
+    # A second worker that read the session before the first save
+    monkeypatch.setattr(api.state, "get_session", lambda _: dict(stale))
+    response = client.post("/submit_answer", json={"session_id": session_id, "answer": answer})
+
+    assert response.status_code == 409
+    assert api.state.get_tokens(ALICE) == initial_tokens + api.TOKENS_PER_CORRECT_ANSWER
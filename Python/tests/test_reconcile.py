@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+ALICE = "0x" + "a1" * 20
+
+
+@pytest.fixture
+def reconciler(api, chain, badge_log, memory_state, tmp_path):
+    return api.BadgeReconciler(str(tmp_path / "reconcile.sqlite3"), 2, 600)
+
+
+def test_mint_charges(backend):
+    backend.record_mint_charge("0x01", "0xa", "ipfs://a", 50)
+    backend.record_mint_charge("0x02", "0xb", "ipfs://b", 75)
+    backend.settle_mint_charge("0x01", "minted")
+    backend.settle_mint_charge("0xmissing", "minted")
+
+    charges = backend.open_mint_charges()
+    assert [(c["tx_hash"], c["user_address"], c["amount"], c["status"]) for c in charges] == \
+        [("0x02", "0xb", 75, "pending")]
+
+
+def upload(api, *metadata_uris):
+    records = [{"student_name": "Alice", "user_address": ALICE, "badge_type": "TopQuizzer", "metadata_uri": uri}
+               for uri in metadata_uris]
+    api.append_badge_log(records)
+
+
+def test_second_run_reads_only_new_blocks_and_records(api, chain, reconciler):
+    upload(api, "ipfs://a", "ipfs://b")
+    for _ in range(4):
+        chain.mine()
+    chain.mint("0xt1", 1, "ipfs://a")
+
+    first = reconciler.run()
+    assert (first["from_block"], first["to_block"]) == (0, 5)
+    assert (first["events_scanned"], first["log_records_scanned"]) == (1, 2)
+    # Ranged in chunks of two blocks
+    assert chain.calls["get_logs"] == 3
+
+    upload(api, "ipfs://c")
+    chain.mint("0xt2", 2, "ipfs://c")
+    second = reconciler.run()
+    assert (second["from_block"], second["to_block"]) == (6, 6)
+    assert (second["events_scanned"], second["log_records_scanned"]) == (1, 1)
+    assert chain.calls["get_logs"] == 4
+    assert second["mints_without_log"] == [] and second["duplicate_mints"] == []
+
+
+def test_orphans_wait_for_the_grace_period(api, chain, reconciler):
+    upload(api, "ipfs://a")
+    assert reconciler.run()["orphaned_metadata"] == []
+
+    reconciler.grace_seconds = 0
+    orphaned = reconciler.run()["orphaned_metadata"]
+    assert [(entry["metadata_uri"], entry["student_name"]) for entry in orphaned] == [("ipfs://a", "Alice")]
+    assert reconciler.run()["orphaned_metadata"] == []
+
+
+def test_mints_without_log_and_duplicates(api, chain, reconciler):
+    chain.mint("0xt1", 1, "ipfs://a")
+    report = reconciler.run()
+    assert [(m["metadata_uri"], m["token_id"], m["tx_hash"]) for m in report["mints_without_log"]] == [
+        ("ipfs://a", 1, "0xt1")]
+
+    # The upload record shows up late and a second mint reuses the URI
+    upload(api, "ipfs://a")
+    chain.mint("0xt2", 2, "ipfs://a")
+    report = reconciler.run()
+    assert report["mints_without_log"] == []
+    assert [(m["metadata_uri"], m["token_id"]) for m in report["duplicate_mints"]] == [("ipfs://a", 2)]
+
+    # Each discrepancy is reported once; the late upload is not an orphan
+    reconciler.grace_seconds = 0
+    report = reconciler.run()
+    assert report["duplicate_mints"] == [] and report["orphaned_metadata"] == []
+
+
+def test_charges_without_mint(api, chain, reconciler):
+    api.state.record_mint_charge("0xminted", ALICE, "ipfs://a", 300)
+    api.state.record_mint_charge("0xreverted", ALICE, "ipfs://b", 300)
+    api.state.record_mint_charge("0xlost", ALICE, "ipfs://c", 300)
+    upload(api, "ipfs://a", "ipfs://b", "ipfs://c")
+    chain.mint("0xminted", 1, "ipfs://a")
+    chain.revert("0xreverted")
+
+    # Within the grace period no receipt is fetched
+    assert reconciler.run()["charges_without_mint"] == []
+    assert chain.calls["get_transaction_receipt"] == 0
+    assert [c["tx_hash"] for c in api.state.open_mint_charges()] == ["0xreverted", "0xlost"]
+
+    reconciler.grace_seconds = 0
+    report = reconciler.run()
+    assert {c["tx_hash"]: c["receipt_status"] for c in report["charges_without_mint"]} == {
+        "0xreverted": "reverted", "0xlost": "not found"}
+    assert chain.calls["get_transaction_receipt"] == 2
+    assert api.state.open_mint_charges() == []
+
+    # Settled as unreconciled, so the receipts are not fetched again
+    assert reconciler.run()["charges_without_mint"] == []
+    assert chain.calls["get_transaction_receipt"] == 2
+
+    # Mined after all: the event settles the charge
+    chain.mint("0xlost", 3, "ipfs://c")
+    reconciler.run()
+    assert api.state.mint_charges["0xlost"]["status"] == "minted"
+
+
+def test_reconcile_endpoint(api, chain, reconciler, client, monkeypatch):
+    monkeypatch.setattr(api, "badge_reconciler", reconciler)
+    chain.mint("0xt1", 1, "ipfs://a")
+
+    response = client.post("/reconcile")
+    assert response.status_code == 200
+    assert response.get_json()["events_scanned"] == 1
+
+
+def test_journal_is_seeded_from_the_existing_log(api, chain, badge_log, reconciler):
+    badge_log.write_text(json.dumps([{"student_name": "Alice", "metadata_uri": "ipfs://old"}]))
+    upload(api, "ipfs://new")
+
+    report = reconciler.run()
+    assert report["log_records_scanned"] == 2
+    assert reconciler.run()["log_records_scanned"] == 0
+
+
+def test_partial_journal_line_waits_for_the_next_run(api, chain, badge_log, reconciler):
+    upload(api, "ipfs://a")
+    with open(api.BADGE_UPLOAD_JOURNAL, "a") as f:
+        f.write('{"metadata_uri": "ipfs://b"')
+
+    assert reconciler.run()["log_records_scanned"] == 1
+    with open(api.BADGE_UPLOAD_JOURNAL, "a") as f:
+        f.write("}\n")
+    assert reconciler.run()["log_records_scanned"] == 1
@@ -0,0 +1,123 @@
+import gzip
+import json
+
+import brotli
+import pytest
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("identity", None),
+    ("gzip;q=bogus", None),
+    ("", None)
+])
+def test_negotiate_encoding(api, header, expected):
+    assert api.negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_brotli(api, monkeypatch):
+    monkeypatch.setattr(api, "brotli", None)
+    assert api.negotiate_encoding("br, gzip") == "gzip"
+    assert api.negotiate_encoding("br") is None
+
+
+@pytest.mark.parametrize("encoder", ["json", "orjson"])
+def test_encoders_keep_insertion_order(api, monkeypatch, encoder):
+    monkeypatch.setattr(api, "JSON_ENCODER", encoder)
+    payload = {"Student Name": "Chloé", "Badge Type": "TopQuizzer", "Tokens Used": 300}
+
+    for encoded in (api.app.json.dumps(payload), api.encode_json(payload).decode()):
+        assert list(json.loads(encoded)) == ["Student Name", "Badge Type", "Tokens Used"]
+        assert json.loads(encoded) == payload
+        assert '", "' not in encoded and '": ' not in encoded
+
+
+@pytest.fixture
+def large_roster(api, client):
+    api.state.import_roster([(f"Student {i:03d}", "0x" + f"{i:040x}") for i in range(100)])
+
+
+@pytest.mark.parametrize("encoding, decompress", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+def test_large_json_is_compressed(client, large_roster, encoding, decompress):
+    plain = client.get("/roster?limit=100")
+    response = client.get("/roster?limit=100", headers={"Accept-Encoding": encoding})
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(decompress(response.get_data())) == plain.get_json()
+    assert len(response.get_data()) < len(plain.get_data())
+
+
+def test_small_json_is_not_compressed(client, large_roster):
+    response = client.get("/roster?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_compressed_variants_get_their_own_etag(api, client, monkeypatch):
+    compressions = []
+    compress_body = api.compress_body
+    monkeypatch.setattr(api, "compress_body", lambda body, encoding: compressions.append(encoding) or
+                        compress_body(body, encoding))
+
+    def get(headers):
+        with api.app.test_request_context("/probe", headers=headers):
+            return api.compress_response(api.conditional_json(["probe", 1], None, lambda: {"rows": ["x" * 50] * 100}))
+
+    first = get({"Accept-Encoding": "gzip"})
+    etag, _ = first.get_etag()
+    assert first.headers["Content-Encoding"] == "gzip" and etag.endswith("-gzip")
+    assert get({"Accept-Encoding": "gzip"}).get_data() == first.get_data()
+    assert compressions == ["gzip"]
+    assert get({"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'}).status_code == 304
+
+
+def test_pre_encoded_question_body(api, client):
+    session_id = client.post("/start_quiz", json={"user_address": "0xabc"}).get_json()["session_id"]
+    question = api.state.get_session(session_id)["questions"][0]
+
+    body = client.get(f"/get_question/{session_id}").get_json()
+    assert body == {"question_number": 1, "total_questions": 5,
+                    "question": question["question"], "options": question["options"]}
+
+
+def test_jsonify_uses_orjson(api, client, monkeypatch):
+    monkeypatch.setattr(api, "JSON_ENCODER", "orjson")
+
+    def stdlib_dumps(*args, **kwargs):
+        raise AssertionError("stdlib json used for a response body")
+
+    monkeypatch.setattr(api.json, "dumps", stdlib_dumps)
+    response = client.get("/roster/search?prefix=a")
+    assert response.status_code == 200
+    assert response.get_data() == b'{"prefix":"a","students":[]}\n'
+
+
+def test_provider_honours_layout_arguments(api, monkeypatch):
+    monkeypatch.setattr(api, "JSON_ENCODER", "orjson")
+    assert api.app.json.dumps({"a": [1]}, indent=2) == '{\n  "a": [\n    1\n  ]\n}'
+    assert api.app.json.dumps({"a": 1}, sort_keys=True, separators=(", ", ": ")) == '{"a": 1}'
+
+
+@pytest.mark.parametrize("encoder", ["json", "orjson"])
+def test_uint256_token_ids_are_encoded(api, monkeypatch, encoder):
+    monkeypatch.setattr(api, "JSON_ENCODER", encoder)
+    outcome = {"tx_hash": "0x01", "status": "minted", "token_id": 2 ** 256 - 1}
+
+    with api.app.app_context():
+        body = api.jsonify(outcome).get_data()
+    assert body == json.dumps(outcome, separators=(",", ":")).encode() + b"\n"
+    assert json.loads(api.encode_json(outcome)) == outcome
+    assert json.loads(api.app.json.dumps(outcome)) == outcome
+
+
+def test_mint_status_with_a_wide_token_id(api, client, badge_log, monkeypatch):
+    monkeypatch.setattr(api, "JSON_ENCODER", "orjson")
+    badge_log.write_text(json.dumps([{"tx_hash": "0x01", "mint_status": "minted", "token_id": 2 ** 70}]))
+
+    response = client.get("/mint_status/0x01")
+    assert response.status_code == 200
+    assert response.get_json()["token_id"] == 2 ** 70
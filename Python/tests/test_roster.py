@@ -0,0 +1,107 @@
+import io
+import json
+
+import pytest
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+
+
+def test_roster(backend):
+    backend.import_roster([("Alice", "0xa"), ("bob", "0xb"), ("Alicia", "0xc")], initial_tokens=100)
+
+    assert backend.roster_count() == 3
+    assert backend.roster_page(0, 2) == [("Alice", "0xa"), ("Alicia", "0xc")]
+    assert backend.roster_page(2, 2) == [("bob", "0xb")]
+    assert backend.roster_search("ali", 10) == [("Alice", "0xa"), ("Alicia", "0xc")]
+    assert backend.roster_search("ALI", 1) == [("Alice", "0xa")]
+    assert backend.roster_search("z", 10) == []
+    assert backend.roster_address("bob") == "0xb"
+    assert backend.roster_name("0xc") == "Alicia"
+    assert backend.get_tokens("0xb") == 100
+
+
+def test_roster_reimport_moves_address(backend):
+    backend.import_roster([("Alice", "0xa")])
+    backend.import_roster([("Alice", "0xnew")])
+
+    assert backend.roster_count() == 1
+    assert backend.roster_address("Alice") == "0xnew"
+    assert backend.roster_name("0xa") is None
+
+
+def test_roster_import_keeps_existing_balances(backend):
+    backend.initialize_tokens("0xa", 5)
+    backend.import_roster([("Alice", "0xa")], initial_tokens=100)
+    assert backend.get_tokens("0xa") == 5
+
+
+@pytest.mark.parametrize("body", [
+    {"Alice": ALICE, "Bob": BOB},
+    {"students": {"Alice": ALICE, "Bob": BOB}},
+    {"students": [{"student_name": "Alice", "user_address": ALICE}, {"student_name": "Bob", "user_address": BOB}]},
+    [{"student_name": "Alice", "user_address": ALICE}, {"student_name": "Bob", "user_address": BOB}]
+])
+def test_roster_import_json(api, client, body):
+    response = client.post("/roster/import", json=body)
+
+    assert response.status_code == 200
+    assert response.get_json()["imported"] == 2
+    assert client.get("/roster/student/Bob").get_json()["user_address"] == BOB
+    assert client.get(f"/roster/address/{ALICE}").get_json()["student_name"] == "Alice"
+    assert api.state.get_tokens(BOB) > 0
+
+
+def test_roster_import_csv(api, client):
+    csv_body = f"student_name,user_address\nAlice,{ALICE}\nBob,{BOB}\n"
+    response = client.post("/roster/import?initialize_balances=false", data=csv_body, content_type="text/csv")
+
+    assert response.status_code == 200
+    assert client.get("/roster/search?prefix=b").get_json()["students"] == [{"student_name": "Bob", "user_address": BOB}]
+    assert api.state.get_tokens(BOB) == 0
+
+
+def test_roster_import_csv_upload(client):
+    upload = io.BytesIO(f"\ufeffstudent_name,user_address\n Alice , {ALICE}\n".encode("utf-8"))
+    response = client.post("/roster/import", data={"roster": (upload, "roster.csv")},
+                           content_type="multipart/form-data")
+
+    assert response.status_code == 200
+    assert client.get("/roster/student/Alice").status_code == 200
+
+
+def test_roster_import_rejects_bad_rows(client):
+    assert client.post("/roster/import", json={"Alice": "not-an-address"}).status_code == 400
+    assert client.post("/roster/import", json={"students": {"Alice": "not-an-address"}}).status_code == 400
+    assert client.post("/roster/import", json={"students": [{"student_name": "Alice"}]}).status_code == 400
+
+
+def test_roster_pages_and_lookups(api, client):
+    api.state.import_roster([(f"Student {i:02d}", "0x" + f"{i:040x}") for i in range(5)])
+
+    page = client.get("/roster?offset=3&limit=10").get_json()
+    assert page["total"] == 5
+    assert [s["student_name"] for s in page["students"]] == ["Student 03", "Student 04"]
+    assert client.get("/roster?limit=x").status_code == 400
+    assert client.get("/roster/student/Nobody").status_code == 404
+    assert client.get(f"/roster/address/{ALICE}").status_code == 404
+
+
+def test_leaderboard_shows_roster_names(api, client):
+    api.state.import_roster([("Alice", ALICE)], initial_tokens=100)
+    api.state.initialize_tokens(BOB, 50)
+
+    leaders = client.get("/leaderboard").get_json()["leaders"]
+    assert [row["student_name"] for row in leaders] == ["Alice", "N/A"]
+
+
+def test_roster_seeded_from_wallet_mapping(api, memory_state, monkeypatch, tmp_path):
+    mapping = tmp_path / "StudentWalletMapping.json"
+    mapping.write_text(json.dumps({"Alice": ALICE}))
+    monkeypatch.setattr(api, "WALLET_MAPPING_FILE", str(mapping))
+
+    api.seed_roster_from_wallet_mapping()
+    assert memory_state.roster_address("Alice") == ALICE
+    mapping.write_text(json.dumps({"Bob": BOB}))
+    api.seed_roster_from_wallet_mapping()
+    assert memory_state.roster_count() == 1
@@ -0,0 +1,85 @@
+import threading
+
+
+def test_save_session_rejects_stale_version(backend):
+    assert backend.save_session("s1", {"current_question": 0})
+    first = backend.get_session("s1")
+    second = backend.get_session("s1")
+
+    first["current_question"] = 1
+    assert backend.save_session("s1", first)
+    second["current_question"] = 2
+    assert not backend.save_session("s1", second)
+
+    assert backend.get_session("s1")["current_question"] == 1
+    assert backend.get_session("s1")["version"] == 2
+
+
+def test_new_session_cannot_overwrite_existing(backend):
+    assert backend.save_session("s1", {"score": 1})
+    assert not backend.save_session("s1", {"score": 2})
+    assert backend.get_session("s1")["score"] == 1
+
+
+def test_missing_session(backend):
+    assert backend.get_session("nope") is None
+
+
+def test_initialize_tokens_only_once(backend):
+    assert backend.initialize_tokens("0xabc", 100) == 100
+    assert backend.initialize_tokens("0xabc", 500) == 100
+    assert backend.get_tokens("0xabc") == 100
+    assert backend.get_tokens("0xdef") == 0
+
+
+def test_add_and_deduct_tokens(backend):
+    backend.initialize_tokens("0xabc", 100)
+    assert backend.add_tokens("0xabc", 25) == 125
+    assert backend.add_tokens("0xnew", 10) == 10
+    assert backend.deduct_tokens("0xabc", 100)
+    assert not backend.deduct_tokens("0xabc", 30)
+    assert backend.get_tokens("0xabc") == 25
+    assert not backend.deduct_tokens("0xnobody", 1)
+
+
+def test_concurrent_deducts_never_overdraw(backend):
+    backend.initialize_tokens("0xabc", 50)
+    results = []
+
+    def spend():
+        for _ in range(20):
+            results.append(backend.deduct_tokens("0xabc", 1))
+
+    threads = [threading.Thread(target=spend) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 50
+    assert backend.get_tokens("0xabc") == 0
+
+
+def test_concurrent_adds_are_not_lost(backend):
+    def earn():
+        for _ in range(50):
+            backend.add_tokens("0xabc", 2)
+
+    threads = [threading.Thread(target=earn) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.get_tokens("0xabc") == 400
+
+
+def test_sqlite_state_survives_reopen(api, tmp_path):
+    db_path = str(tmp_path / "state.db")
+    first = api.SQLiteStateBackend(db_path)
+    first.initialize_tokens("0xa", 100)
+    first.save_session("s1", {"score": 3})
+
+    second = api.SQLiteStateBackend(db_path)
+    assert second.get_tokens("0xa") == 100
+    assert second.get_session("s1")["score"] == 3